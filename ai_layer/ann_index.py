@@ -0,0 +1,295 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index over face encodings.
+
+Encodings are clustered with k-means into nlist cells; a query only scans the nprobe
+cells whose centroids are closest, so lookup cost grows with N / nlist * nprobe instead
+of N. nprobe is the recall knob (nprobe = nlist is exact search). Inserts and deletes
+are incremental; the centroids are only retrained when the gallery has grown or shrunk
+a lot since training (see stale).
+
+    python ann_index.py --size 50000 --queries 500 --nprobe 1 4 8 16
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from face_index import ENCODING_DIM, FaceIndex
+
+
+def _sq_dists(queries, points, point_sq_norms):
+    sq = np.einsum("ij,ij->i", queries, queries)[:, None] + point_sq_norms[None, :] - 2.0 * (queries @ points.T)
+    return np.maximum(sq, 0.0)
+
+
+def kmeans(data, k, iterations=20, seed=0):
+    """Plain Lloyd k-means in NumPy; returns (k, dim) float32 centroids."""
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    k = max(1, min(k, len(data)))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmin(_sq_dists(data, centroids, np.einsum("ij,ij->i", centroids, centroids)), axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            # Re-seed empty cells on the points currently worst served by their centroid
+            residual = data - centroids[assign]
+            worst = np.argsort(np.einsum("ij,ij->i", residual, residual))[::-1][:empty.sum()]
+            centroids[empty] = data[worst]
+    return centroids
+
+
+class IVFFaceIndex:
+    """Campus-wide gallery for "who is this unknown face" lookups.
+
+    Thread-safe: recognition threads search while a resync inserts or deletes. On disk
+    it is one .npz (float16 vectors, no pickling), loaded back without retraining.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, train_iterations=20):
+        self.nlist = nlist  # None: about sqrt(N) cells, chosen at training time
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.centroids = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self.centroid_sq = np.empty(0, dtype=np.float32)
+        self.list_ids = []    # Per cell: [student_id]
+        self.list_vecs = []   # Per cell: (n, 128) float32
+        self.list_sq = []     # Per cell: (n,) squared norms
+        self.where = {}       # { student_id: (cell, row) }
+        self.trained_size = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.where)
+
+    def __contains__(self, student_id):
+        return student_id in self.where
+
+    @property
+    def stale(self):
+        """True when the gallery has drifted far enough from training size to retrain."""
+        n = len(self.where)
+        return self.trained_size == 0 or n > 4 * self.trained_size or n < self.trained_size / 4
+
+    def train(self, matrix, sample=100_000, seed=0):
+        """Fit centroids on (a sample of) matrix and empty the index."""
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(matrix) > sample:
+            matrix = matrix[np.random.default_rng(seed).choice(len(matrix), sample, replace=False)]
+        nlist = self.nlist or max(1, int(round(np.sqrt(len(matrix)))))
+        centroids = kmeans(matrix, nlist, self.train_iterations, seed) if len(matrix) else self.centroids
+        with self.lock:
+            self.centroids = centroids
+            self.centroid_sq = np.einsum("ij,ij->i", centroids, centroids)
+            self.list_ids = [[] for _ in range(len(centroids))]
+            self.list_vecs = [np.empty((0, ENCODING_DIM), dtype=np.float32) for _ in range(len(centroids))]
+            self.list_sq = [np.empty(0, dtype=np.float32) for _ in range(len(centroids))]
+            self.where = {}
+            self.trained_size = len(matrix)
+        return self
+
+    def build(self, encodings):
+        """Train on and index a { student_id: encoding } dict from scratch."""
+        ids = list(encodings)
+        matrix = np.array([encodings[sid] for sid in ids], dtype=np.float32).reshape(len(ids), ENCODING_DIM)
+        self.train(matrix)
+        self._insert(ids, matrix)
+        return self
+
+    def add(self, encodings):
+        """Insert or replace { student_id: encoding } entries."""
+        if not encodings:
+            return
+        ids = list(encodings)
+        matrix = np.array([encodings[sid] for sid in ids], dtype=np.float32).reshape(len(ids), ENCODING_DIM)
+        with self.lock:
+            if len(self.centroids) == 0:
+                self.train(matrix)
+            self.remove(sid for sid in ids if sid in self.where)
+            self._insert(ids, matrix)
+
+    def _insert(self, ids, matrix):
+        with self.lock:
+            cells = np.argmin(_sq_dists(matrix, self.centroids, self.centroid_sq), axis=1)
+            for cell in np.unique(cells):
+                rows = np.flatnonzero(cells == cell)
+                start = len(self.list_ids[cell])
+                self.list_ids[cell].extend(ids[r] for r in rows)
+                self.list_vecs[cell] = np.concatenate([self.list_vecs[cell], matrix[rows]])
+                self.list_sq[cell] = np.concatenate([self.list_sq[cell], np.einsum("ij,ij->i", matrix[rows], matrix[rows])])
+                for offset, r in enumerate(rows):
+                    self.where[ids[r]] = (int(cell), start + offset)
+
+    def remove(self, student_ids):
+        """Delete entries (swap-with-last within their cell); unknown IDs are ignored."""
+        with self.lock:
+            for sid in list(student_ids):
+                location = self.where.pop(sid, None)
+                if location is None:
+                    continue
+                cell, row = location
+                last = len(self.list_ids[cell]) - 1
+                if row != last:
+                    moved = self.list_ids[cell][last]
+                    self.list_ids[cell][row] = moved
+                    self.list_vecs[cell][row] = self.list_vecs[cell][last]
+                    self.list_sq[cell][row] = self.list_sq[cell][last]
+                    self.where[moved] = (cell, row)
+                self.list_ids[cell].pop()
+                self.list_vecs[cell] = self.list_vecs[cell][:last]
+                self.list_sq[cell] = self.list_sq[cell][:last]
+
+    def sync(self, encodings, atol=1e-3):
+        """Make the index hold exactly encodings; returns (upserted, removed) counts.
+
+        Entries already stored with the same vector (to float16 precision) are left alone,
+        so a resync only pays for the students that actually changed.
+        """
+        with self.lock:
+            removed = [sid for sid in self.where if sid not in encodings]
+            self.remove(removed)
+            changed = {}
+            for sid, encoding in encodings.items():
+                location = self.where.get(sid)
+                if location is None or not np.allclose(self.list_vecs[location[0]][location[1]], encoding, atol=atol):
+                    changed[sid] = encoding
+            self.add(changed)
+        return len(changed), len(removed)
+
+    def search(self, face_encodings, k=1, nprobe=None):
+        """k nearest gallery entries per face: [[(student_id, distance)]], best first."""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        if len(queries) == 0:
+            return []
+        with self.lock:
+            if not self.where:
+                return [[] for _ in queries]
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            cell_dists = _sq_dists(queries, self.centroids, self.centroid_sq)
+            probes = np.argpartition(cell_dists, nprobe - 1, axis=1)[:, :nprobe]
+            q_sq = np.einsum("ij,ij->i", queries, queries)
+            results = []
+            for query, query_sq, cells in zip(queries, q_sq, probes):
+                cells = [c for c in cells if self.list_ids[c]]
+                if not cells:
+                    results.append([])
+                    continue
+                # One small matrix-vector product per probed cell; IDs are only looked up for the winners
+                partial = [self.list_sq[c] - 2.0 * (self.list_vecs[c] @ query) for c in cells]
+                sq = np.concatenate(partial) if len(partial) > 1 else partial[0]
+                top = np.argpartition(sq, min(k, len(sq)) - 1)[:k] if len(sq) > k else np.arange(len(sq))
+                top = top[np.argsort(sq[top])]
+                bounds = np.cumsum([len(p) for p in partial])
+                hits = []
+                for i in top:
+                    j = int(np.searchsorted(bounds, i, side="right"))
+                    row = i - (bounds[j - 1] if j else 0)
+                    hits.append((self.list_ids[cells[j]][row], float(np.sqrt(max(sq[i] + query_sq, 0.0)))))
+                results.append(hits)
+            return results
+
+    def match(self, face_encodings, tolerance=0.55, nprobe=None):
+        """Same contract as FaceIndex.match: [(student_id or None, distance)]."""
+        matches = []
+        for hits in self.search(face_encodings, 1, nprobe):
+            if hits and hits[0][1] <= tolerance:
+                matches.append(hits[0])
+            else:
+                matches.append((None, hits[0][1] if hits else float("inf")))
+        return matches
+
+    def save(self, path):
+        """Write the index atomically as one .npz (float16 vectors, cell offsets, IDs)."""
+        with self.lock:
+            ids = [sid for cell in self.list_ids for sid in cell]
+            vecs = (np.concatenate(self.list_vecs) if self.list_vecs else np.empty((0, ENCODING_DIM))).astype(np.float16)
+            offsets = np.cumsum([0] + [len(cell) for cell in self.list_ids]).astype(np.int64)
+            centroids = self.centroids
+            meta = np.array([self.trained_size, self.nprobe], dtype=np.int64)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, centroids=centroids, vectors=vecs, offsets=offsets,
+                 ids=np.array(ids, dtype=str) if ids else np.empty(0, dtype="U1"), meta=meta)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, nprobe=None):
+        with np.load(path, allow_pickle=False) as data:
+            trained_size, saved_nprobe = (int(v) for v in data["meta"])
+            index = cls(nprobe=nprobe or saved_nprobe)
+            index.centroids = data["centroids"].astype(np.float32)
+            index.nlist = len(index.centroids)
+            index.centroid_sq = np.einsum("ij,ij->i", index.centroids, index.centroids)
+            vecs = data["vectors"].astype(np.float32)
+            ids = data["ids"].tolist()
+            offsets = data["offsets"]
+        index.trained_size = trained_size
+        for cell in range(len(index.centroids)):
+            start, end = offsets[cell], offsets[cell + 1]
+            index.list_ids.append(ids[start:end])
+            index.list_vecs.append(np.ascontiguousarray(vecs[start:end]))
+            index.list_sq.append(np.einsum("ij,ij->i", vecs[start:end], vecs[start:end]))
+            for row, sid in enumerate(ids[start:end]):
+                index.where[sid] = (cell, row)
+        return index
+
+
+def synthetic_gallery(size, identities_seed=0):
+    """Clustered 128-d vectors shaped like dlib encodings (per-identity spread ~0.3)."""
+    rng = np.random.default_rng(identities_seed)
+    groups = max(1, size // 50)
+    centers = rng.normal(0, 0.09, (groups, ENCODING_DIM))
+    gallery = centers[rng.integers(0, groups, size)] + rng.normal(0, 0.045, (size, ENCODING_DIM))
+    return {f"s{i:06d}": gallery[i] for i in range(size)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of IVFFaceIndex against exact FaceIndex search.")
+    parser.add_argument("--size", type=int, default=50000, help="Gallery size (synthetic unless --encodings)")
+    parser.add_argument("--encodings", help="EncodingStore directory to use as the gallery instead (e.g. known_faces)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--noise", type=float, default=0.02, help="Std-dev added to gallery vectors to make queries")
+    parser.add_argument("--batch", type=int, default=4, help="Faces per lookup, as in one recognition pass")
+    args = parser.parse_args()
+
+    if args.encodings:
+        from encoding_store import EncodingStore
+        gallery = EncodingStore(args.encodings).load().encodings()
+    else:
+        gallery = synthetic_gallery(args.size)
+    ids = list(gallery)
+    rng = np.random.default_rng(1)
+    picks = rng.choice(len(ids), min(args.queries, len(ids)), replace=False)
+    queries = np.array([gallery[ids[i]] for i in picks]) + rng.normal(0, args.noise, (len(picks), ENCODING_DIM))
+
+    batches = [queries[i:i + args.batch] for i in range(0, len(queries), args.batch)]
+
+    def timed(match):
+        t0 = time.perf_counter()
+        found = [sid for batch in batches for sid, _ in match(batch)]
+        return found, (time.perf_counter() - t0) * 1000 / len(queries)
+
+    exact = FaceIndex(gallery)
+    truth, exact_ms = timed(lambda batch: exact.match(batch, tolerance=float("inf")))
+
+    t0 = time.perf_counter()
+    ann = IVFFaceIndex(nlist=args.nlist).build(gallery)
+    build_s = time.perf_counter() - t0
+    print(f"Gallery {len(ids)}, {len(ann.centroids)} cells, built in {build_s:.2f}s; "
+          f"exact search {exact_ms:.3f} ms/face ({args.batch} faces per lookup)")
+    print(f"{'nprobe':>6} {'recall@1':>9} {'ms/face':>8} {'speedup':>8} {'scanned':>8}")
+    for nprobe in args.nprobe:
+        found, ms = timed(lambda batch: ann.match(batch, tolerance=float("inf"), nprobe=nprobe))
+        recall = np.mean([a == b for a, b in zip(found, truth)])
+        scanned = min(nprobe, len(ann.centroids)) / len(ann.centroids)
+        print(f"{nprobe:>6} {recall:>9.3f} {ms:>8.3f} {exact_ms / ms:>7.1f}x {scanned:>7.1%}")
+
+
+if __name__ == '__main__':
+    main()
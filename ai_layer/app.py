@@ -3,28 +3,89 @@ import requests
 import threading
 import time
 import os
-import urllib.request
 import cv2
 import numpy as np
-import face_recognition
-import mediapipe as mp
-import math
 from flask_cors import CORS
+from face_index import FaceIndex
+from ann_index import IVFFaceIndex
+from sync_store import SyncStore
+from encoding_store import EncodingStore
+from enrollment import enroll_students
+from event_uploader import EventUploader
+from stream_broadcaster import FrameBroadcaster
+from mosaic import MosaicComposer
+from frame_ring import FrameRing
+from camera_source import CameraSource, STREAMING
+from inference_scheduler import InferenceScheduler
+from presence_tracker import PresenceTracker
+from metrics import Registry
+from startup import StartupPhases, READY
 
 app = Flask(__name__)
 CORS(app)
 
-BACKEND_BASE_URL = "http://localhost:5000/api"
+BACKEND_BASE_URL = os.environ.get("AI_BACKEND_URL", "http://localhost:5000/api")
 SYNC_URL = f"{BACKEND_BASE_URL}/ai/sync"
+SYNC_DELTA_URL = f"{SYNC_URL}/delta"
 EVENT_URL = f"{BACKEND_BASE_URL}/ai/events"
 ABSENT_URL = f"{BACKEND_BASE_URL}/ai/absent"
+EVENT_BULK_URL = f"{EVENT_URL}/bulk"
+ABSENT_BULK_URL = f"{ABSENT_URL}/bulk"
+ABSENT_AFTER_SECONDS = 30
 
 KNOWN_FACES_DIR = "known_faces"
-os.makedirs(KNOWN_FACES_DIR, exist_ok=True)
 
-# MediaPipe Setup
-mp_face_mesh = mp.solutions.face_mesh
-# NOTE: FaceMesh is NOT thread-safe. Each camera thread creates its own instance.
+# Enrollment pool sizes (0 = one encoding process per CPU)
+ENROLL_WORKERS = int(os.environ.get("AI_ENROLL_WORKERS", "0")) or None
+ENROLL_DOWNLOAD_WORKERS = int(os.environ.get("AI_ENROLL_DOWNLOAD_WORKERS", "8"))
+
+# Optional campus-wide IVF index: faces that miss the session roster are looked up among
+# every enrolled student, so someone sitting in the wrong room is named instead of "Unknown!".
+# AI_CAMPUS_NPROBE trades recall for lookup time (see ann_index.py for the benchmark).
+CAMPUS_INDEX_ENABLED = os.environ.get("AI_CAMPUS_INDEX", "0") in ("1", "true")
+CAMPUS_INDEX_PATH = os.path.join(KNOWN_FACES_DIR, "campus_ivf.npz")
+CAMPUS_NPROBE = int(os.environ.get("AI_CAMPUS_NPROBE", "8"))
+
+# "scheduled": a fixed pool of inference workers shared by all cameras under one FPS budget (default)
+# "thread": one free-running AI thread per camera in this process
+# "process": one supervised inference process per camera, frames passed via shared memory
+AI_EXECUTION_MODE = os.environ.get("AI_EXECUTION_MODE", "scheduled")
+SCHEDULER_WORKERS = int(os.environ.get("AI_SCHEDULER_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+GLOBAL_FPS_BUDGET = float(os.environ.get("AI_GLOBAL_FPS_BUDGET", "40"))
+
+# Capture decodes only the frames consumers use: CAPTURE_FPS for inference, raised to
+# VIEWER_CAPTURE_FPS while someone watches /video_feed (AI_CAPTURE_FPS=0 decodes every frame).
+# Larger sources are scaled down to fit CAPTURE_WIDTH x CAPTURE_HEIGHT.
+CAPTURE_FPS = float(os.environ.get("AI_CAPTURE_FPS", "20"))
+VIEWER_CAPTURE_FPS = float(os.environ.get("AI_VIEWER_CAPTURE_FPS", "30"))
+CAPTURE_WIDTH = int(os.environ.get("AI_CAPTURE_WIDTH", "640"))
+CAPTURE_HEIGHT = int(os.environ.get("AI_CAPTURE_HEIGHT", "480"))
+
+# /video_mosaic: all of a session's cameras tiled into one stream, composed and encoded once per tick
+MOSAIC_FPS = float(os.environ.get("AI_MOSAIC_FPS", "5"))
+MOSAIC_WIDTH = int(os.environ.get("AI_MOSAIC_WIDTH", "1280"))
+MOSAIC_HEIGHT = int(os.environ.get("AI_MOSAIC_HEIGHT", "720"))
+MOSAIC_IDLE_SECONDS = 5.0  # Composer thread exits after this long without viewers
+
+# Startup runs in the background (see STARTUP below); /start-mocking waits this long for it
+# before answering 503; ?wait=<seconds> can shorten (never extend) that per request
+READY_WAIT_SECONDS = float(os.environ.get("AI_READY_WAIT_SECONDS", "30"))
+STARTUP = StartupPhases(("models", "sync"))
+
+# Prometheus metrics for /metrics. Hot-path cost is a perf_counter pair and one observe().
+METRICS = Registry()
+STAGE_SECONDS = METRICS.histogram("ai_stage_seconds", "Time spent in each capture/inference stage", ("camera", "stage"))
+FRAME_LATENCY_SECONDS = METRICS.histogram("ai_frame_latency_seconds", "Capture to end-of-inference latency per processed frame", ("camera",))
+BACKEND_POST_SECONDS = METRICS.histogram("ai_backend_post_seconds", "Bulk POST round trips to the backend", ("endpoint", "outcome"))
+FRAMES_CAPTURED = METRICS.counter("ai_frames_captured_total", "Frames decoded from the camera", ("camera",))
+FRAMES_PROCESSED = METRICS.counter("ai_frames_processed_total", "Frames run through the CV pipeline", ("camera",))
+FRAMES_SKIPPED = METRICS.counter("ai_frames_skipped_total", "Captured frames never run through the pipeline (superseded or motion-gated)", ("camera",))
+
+def report_absences(class_session_id, student_ids):
+    """PresenceTracker callback: queue every student whose deadline expired in one go."""
+    for sid in student_ids:
+        print(f"[AI] Student {global_state['known_names'].get(sid)} missing {ABSENT_AFTER_SECONDS}s! Marking absent.")
+        global_state["absent_uploader"].submit({"studentId": sid, "classSessionId": class_session_id})
 
 global_state = {
     "students": [],
@@ -32,98 +93,336 @@ global_state = {
     "cameras": [],
     "known_encodings": {},
     "known_names": {},
-    "mocking_active": False,
-    "current_session": None,
-    "unseen_timers": {},
-    "presence_start": {},
-    "session_start_time": None,
-    "recent_detections": [],
-    "camera_streams": {},  # { cam_id: cv2.VideoCapture }
+    "sync_store": SyncStore(),  # Mirror of the backend's sync data, updated by deltas
+    "sync_lock": threading.Lock(),
+    "last_sync": None,          # Kind, cursor and change counts of the most recent sync
+    "last_enrollment": None,  # Summary of the most recent enroll_students run
+    "encoding_store": EncodingStore(KNOWN_FACES_DIR),  # On-disk cache of known_encodings, loaded by start()
+    "face_index": FaceIndex(),     # All enrolled encodings, rebuilt on sync
+    "campus_index": None,          # IVFFaceIndex over all encodings (AI_CAMPUS_INDEX), updated in place on sync
+    # Concurrent sessions, one per classroom. Each holds its own roster, cameras, FaceIndex
+    # subset, presence map and recent detections; encodings and models are shared read-only.
+    "sessions": {},         # { classSessionId: session }
+    "camera_sessions": {},  # { cam_id: classSessionId } owning each running camera
+    "camera_streams": {},  # { cam_id: CameraSource } with per-camera health
     "latest_frames": {},   # { cam_id: frame }
-    "raw_frames": {},      # { cam_id: frame }
+    "raw_frames": {},      # { cam_id: FrameRing } of undecorated frames for the AI thread
+    "frame_stats": {},     # { cam_id: capture->inference latency and processed/skipped counts }
     "ai_boxes": {},        # { cam_id: list of boxes }
-    "active_cam_threads": set()  # Set of cam_ids currently running threads
+    "worker_supervisor": None,  # CameraWorkerSupervisor in "process" mode
+    "scheduler": None,          # InferenceScheduler in "scheduled" mode
+    "broadcasters": {},    # { cam_id: FrameBroadcaster } shared by all /video_feed viewers
+    "mosaics": {},         # { mosaic key: FrameBroadcaster } fed by one composer thread each
+    "mosaic_claims": {},   # { mosaic key: last get_mosaic() time }, so a viewer still connecting keeps it alive
+    "mosaics_lock": threading.Lock(),
+    "camera_stops": {},    # { cam_id: threading.Event } set to stop that camera's threads
+    # Backend POSTs never happen on the CV threads; these drain to the bulk endpoints (started by start())
+    "event_uploader": EventUploader(
+        EVENT_BULK_URL, "events", on_post=lambda s, outcome: BACKEND_POST_SECONDS.observe(s, endpoint="events", outcome=outcome)
+    ),
+    "absent_uploader": EventUploader(
+        ABSENT_BULK_URL, "absences", on_post=lambda s, outcome: BACKEND_POST_SECONDS.observe(s, endpoint="absences", outcome=outcome)
+    ),
+    # Last-seen deadlines for the absent rule, merged from every camera
+    "presence_tracker": PresenceTracker(ABSENT_AFTER_SECONDS, on_absent=report_absences),
+    "started": False
 }
 
+UPLOADERS = {"events": "event_uploader", "absences": "absent_uploader"}
+
+def upload_samples(keys):
+    samples = {}
+    for endpoint, state_key in UPLOADERS.items():
+        stats = global_state[state_key].stats()
+        for key in keys:
+            samples[(endpoint, key)] = stats[key]
+    return samples
+
+def scheduler_samples():
+    scheduler = global_state["scheduler"]
+    if scheduler is None:
+        return {}
+    return {
+        (cam_id, outcome): cam[outcome]
+        for cam_id, cam in scheduler.stats()["cameras"].items()
+        for outcome in ("processed", "gated", "stale")
+    }
+
+METRICS.counter_callback("ai_uploads_total", "Backend payloads by outcome", ("endpoint", "outcome"),
+                         lambda: upload_samples(("queued", "sent", "failed", "dropped")))
+METRICS.counter_callback("ai_upload_retries_total", "Bulk POST retries", ("endpoint",),
+                         lambda: {(endpoint,): global_state[key].stats()["retries"] for endpoint, key in UPLOADERS.items()})
+METRICS.gauge_callback("ai_upload_queue_depth", "Payloads waiting to be sent", ("endpoint",),
+                       lambda: {(endpoint,): global_state[key].stats()["depth"] for endpoint, key in UPLOADERS.items()})
+METRICS.gauge_callback("ai_stream_viewers", "Connected /video_feed and /video_mosaic viewers", ("camera",),
+                       lambda: {(key,): b.viewers for key, b in list(global_state["broadcasters"].items()) + list(global_state["mosaics"].items())})
+METRICS.gauge_callback("ai_inference_rate_hz", "Current motion-gated inference rate", ("camera",),
+                       lambda: {(cam_id,): s["rateHz"] for cam_id, s in list(global_state["frame_stats"].items()) if "rateHz" in s})
+def camera_health_samples(key):
+    return {(cam_id,): source.health()[key] for cam_id, source in list(global_state["camera_streams"].items())}
+
+METRICS.gauge_callback("ai_camera_up", "1 while the camera is delivering frames", ("camera",),
+                       lambda: {(cam_id,): int(s.state == STREAMING) for cam_id, s in list(global_state["camera_streams"].items())})
+METRICS.counter_callback("ai_frames_grabbed_total", "Frames pulled from the stream (decoded or drained)", ("camera",),
+                         lambda: camera_health_samples("grabbed"))
+METRICS.counter_callback("ai_capture_failures_total", "Failed grabs/decodes", ("camera",),
+                         lambda: camera_health_samples("failures"))
+METRICS.counter_callback("ai_camera_reconnects_total", "Stream reopen attempts after a failure or stall", ("camera",),
+                         lambda: camera_health_samples("reconnects"))
+METRICS.counter_callback("ai_scheduler_frames_total", "Scheduler decisions per camera (scheduled mode)", ("camera", "outcome"),
+                         scheduler_samples)
+METRICS.gauge_callback("ai_startup_phase_ready", "1 once a startup phase has completed", ("phase",),
+                       lambda: {(name,): int(p["state"] == READY) for name, p in STARTUP.summary()["phases"].items()})
+METRICS.gauge_callback("ai_known_faces", "Enrolled face encodings", (), lambda: {(): len(global_state["known_encodings"])})
+METRICS.gauge_callback("ai_active_sessions", "Sessions being monitored", (), lambda: {(): len(global_state["sessions"])})
+METRICS.gauge_callback("ai_active_cameras", "Cameras being captured", (), lambda: {(): len(global_state["camera_stops"])})
+
+def get_broadcaster(cam_id):
+    broadcaster = global_state["broadcasters"].get(cam_id)
+    if broadcaster is None:
+        broadcaster = global_state["broadcasters"].setdefault(cam_id, FrameBroadcaster())
+    return broadcaster
+
+def mosaic_cameras(class_session_id=None, classroom_id=None):
+    """Cameras for a mosaic: one session, every session in a classroom, or all running sessions."""
+    cameras = []
+    for sid, session in list(global_state["sessions"].items()):
+        if class_session_id and sid != class_session_id:
+            continue
+        if classroom_id and session["classroomId"] != classroom_id:
+            continue
+        cameras.extend(session["active_cameras"])
+    return cameras
+
+def mosaic_thread(key, broadcaster, class_session_id, classroom_id):
+    composer = MosaicComposer(MOSAIC_WIDTH, MOSAIC_HEIGHT)
+    interval = 1.0 / MOSAIC_FPS
+    idle_since = None
+    while True:
+        tick = time.time()
+        if broadcaster.viewers:
+            idle_since = None
+            sources = [(c["name"], global_state["latest_frames"].get(c["_id"]))
+                       for c in mosaic_cameras(class_session_id, classroom_id)]
+            t0 = time.perf_counter()
+            broadcaster.publish(composer.compose(sources))
+            STAGE_SECONDS.observe(time.perf_counter() - t0, camera=key, stage="mosaic")
+        else:
+            idle_since = idle_since or tick
+            with global_state["mosaics_lock"]:
+                # A viewer only counts once its response starts streaming; a recent claim
+                # means get_mosaic() just handed this broadcaster to one
+                idle_from = max(idle_since, global_state["mosaic_claims"].get(key, 0.0))
+                if tick - idle_from > MOSAIC_IDLE_SECONDS and not broadcaster.viewers:
+                    del global_state["mosaics"][key]
+                    global_state["mosaic_claims"].pop(key, None)
+                    break
+        time.sleep(max(0.0, interval - (time.time() - tick)))
+    print(f"[MOSAIC] Stopped {key}")
+
+def get_mosaic(class_session_id=None, classroom_id=None):
+    """The shared broadcaster for a mosaic, starting its composer thread on first use."""
+    key = f"mosaic:{class_session_id or ''}:{classroom_id or ''}"
+    with global_state["mosaics_lock"]:
+        global_state["mosaic_claims"][key] = time.time()
+        broadcaster = global_state["mosaics"].get(key)
+        if broadcaster is None:
+            broadcaster = global_state["mosaics"][key] = FrameBroadcaster()  # Paced by the composer
+            threading.Thread(target=mosaic_thread, args=(key, broadcaster, class_session_id, classroom_id),
+                             name=key, daemon=True).start()
+            print(f"[MOSAIC] Started {key}")
+    return broadcaster
+
+def session_roster_encodings(student_ids):
+    return {sid: global_state["known_encodings"][sid] for sid in student_ids if sid in global_state["known_encodings"]}
+
+def session_for_camera(cam_id):
+    """The running session that owns cam_id, or None."""
+    return global_state["sessions"].get(global_state["camera_sessions"].get(cam_id))
+
+def push_session_index(session):
+    """Hand a session's (re)built FaceIndex / roster to the pipelines of its cameras."""
+    cam_ids = [c["_id"] for c in session["active_cameras"]]
+    if global_state["worker_supervisor"] is not None:
+        global_state["worker_supervisor"].set_roster(session_roster_encodings(session["students"]), cam_ids)
+    if global_state["scheduler"] is not None:
+        for cam_id in cam_ids:
+            pipeline = global_state["scheduler"].pipeline(cam_id)
+            if pipeline is not None:
+                pipeline.set_index(session["index"])
+    # Thread mode picks up session["index"] on its next pass
+
+def update_campus_index():
+    """Bring the campus index in line with known_encodings: in place when possible, retrained when stale."""
+    encodings = global_state["known_encodings"]
+    index = global_state["campus_index"]
+    if index is None and os.path.exists(CAMPUS_INDEX_PATH):
+        try:
+            index = IVFFaceIndex.load(CAMPUS_INDEX_PATH, nprobe=CAMPUS_NPROBE)
+            print(f"[INIT] Loaded campus index ({len(index)} faces) from {CAMPUS_INDEX_PATH}")
+        except Exception as e:
+            print(f"[INIT ERROR] Could not load campus index, rebuilding: {e}")
+    if not encodings:
+        if index is not None:
+            index.remove(list(index.where))  # Everyone unenrolled; keep the trained cells
+        return
+    t0 = time.time()
+    upserted, removed = index.sync(encodings) if index is not None else (len(encodings), 0)
+    changed = bool(upserted or removed)
+    if index is None or index.stale:
+        index = IVFFaceIndex(nprobe=CAMPUS_NPROBE).build(encodings)
+        changed = True
+        print(f"[INIT] Campus index trained: {len(index)} faces in {len(index.centroids)} cells ({time.time() - t0:.1f}s)")
+    elif changed:
+        print(f"[INIT] Campus index updated: {upserted} upserted, {removed} removed ({time.time() - t0:.2f}s)")
+    if changed:
+        index.save(CAMPUS_INDEX_PATH)
+    if index is not global_state["campus_index"]:
+        global_state["campus_index"] = index
+        if global_state["scheduler"] is not None:
+            for pipeline in global_state["scheduler"].pipelines():
+                pipeline.set_campus_index(index)
+        # Thread mode picks it up on its next pass
+    elif not changed:
+        return
+    if global_state["worker_supervisor"] is not None:
+        # Worker processes load their own copy from the saved file
+        global_state["worker_supervisor"].set_campus_index(CAMPUS_INDEX_PATH)
+
+def get_worker_supervisor():
+    if global_state["worker_supervisor"] is None:
+        from camera_worker import CameraWorkerSupervisor
+        global_state["worker_supervisor"] = CameraWorkerSupervisor()
+        if global_state["campus_index"] is not None:
+            global_state["worker_supervisor"].set_campus_index(CAMPUS_INDEX_PATH)
+        threading.Thread(target=worker_results_thread, daemon=True).start()
+    return global_state["worker_supervisor"]
+
+def get_scheduler():
+    if global_state["scheduler"] is None:
+        global_state["scheduler"] = InferenceScheduler(workers=SCHEDULER_WORKERS, fps_budget=GLOBAL_FPS_BUDGET)
+    return global_state["scheduler"]
+
 def get_id_from_field(field):
     """Safely extract string _id from a field that may be an object dict or a plain string."""
     if isinstance(field, dict):
         return field.get("_id", "")
     return str(field) if field else ""
 
-def sync_backend_data():
-    print("[INIT] Syncing with Backend Authority...")
-    try:
-        res = requests.get(SYNC_URL)
-        res.raise_for_status()
-        data = res.json()
-        
-        global_state["students"] = data.get("students", [])
-        global_state["classrooms"] = data.get("classrooms", [])
-        global_state["cameras"] = data.get("cameras", [])
+def fetch_sync(cursor):
+    """One sync round trip: changes since cursor (a full snapshot when cursor is None)."""
+    res = requests.get(SYNC_DELTA_URL, params={"since": cursor} if cursor else None)
+    if res.status_code == 404:
+        res = requests.get(SYNC_URL)  # Backend without the delta route
+    res.raise_for_status()
+    return res.json()
+
+def sync_backend_data(full=False):
+    """Pull changes from the backend and re-enroll / re-index what changed; returns True on success."""
+    with global_state["sync_lock"]:  # /resync, /start-mocking and the startup sync never overlap
+        print("[INIT] Syncing with Backend Authority...")
+        try:
+            store = global_state["sync_store"]
+            data = fetch_sync(None if full else store.cursor)
+            changes = store.apply(data)
+            full = data.get("full", "deleted" not in data)
         
-        for student in global_state["students"]:
-            sid = student.get("_id")
-            image_url = student.get("imageUrl")
-            name = student.get('userId', {}).get('name', 'Unknown')
-            
-            global_state["known_names"][sid] = name
-            
-            if image_url:
-                filename = os.path.join(KNOWN_FACES_DIR, f"{sid}.jpg")
-                if not os.path.exists(filename):
-                    print(f"Downloading face for {name}...")
-                    try:
-                        urllib.request.urlretrieve(image_url, filename)
-                    except:
-                        continue
-                
-                try:
-                    img = face_recognition.load_image_file(filename)
-                    encodings = face_recognition.face_encodings(img)
-                    if len(encodings) > 0:
-                        global_state["known_encodings"][sid] = encodings[0]
-                        print(f"[INIT] Successfully registered face for {name}")
-                except Exception as e:
-                    print(f"Error encoding {filename}: {e}")
-                    
-        print(f"[INIT] Sync Complete! {len(global_state['known_encodings'])} faces registered. Ready for Real-Time CV.")
-    except Exception as e:
-        print(f"[INIT ERROR] Could not sync with backend: {e}")
-
-sync_backend_data()
-
-def calc_distance(p1, p2):
-    return math.hypot(p2.x - p1.x, p2.y - p1.y)
-
-
-def camera_capture_thread(cam_info):
-    """Dedicated thread for fetching frames from a specific camera"""
+            global_state["students"] = store.list("students")
+            global_state["classrooms"] = store.list("classrooms")
+            global_state["cameras"] = store.list("cameras")
+            global_state["last_sync"] = {
+                "full": full,
+                "cursor": store.cursor,
+                "changes": {name: {kind: len(ids) for kind, ids in c.items()} for name, c in changes.items()}
+            }
+
+            # Only students that changed (or failed last time) go through enrollment
+            previous = global_state["last_enrollment"]
+            retry = set(previous["failed"]) if previous else set()
+            student_changes = changes["students"]
+            encoding_store = global_state["encoding_store"]
+            if full or previous is None:
+                summary = enroll_students(global_state["students"], encoding_store, KNOWN_FACES_DIR,
+                                          workers=ENROLL_WORKERS, download_workers=ENROLL_DOWNLOAD_WORKERS)
+            elif student_changes["upserted"] or student_changes["deleted"] or retry:
+                changed = [store.get("students", sid) for sid in set(student_changes["upserted"]) | retry]
+                summary = enroll_students([s for s in changed if s], encoding_store, KNOWN_FACES_DIR,
+                                          workers=ENROLL_WORKERS, download_workers=ENROLL_DOWNLOAD_WORKERS, prune=False)
+                for sid in student_changes["deleted"]:
+                    encoding_store.remove(sid)
+                encoding_store.save()
+                summary["removed"] = student_changes["deleted"]
+            else:
+                print(f"[INIT] Sync Complete! No roster changes; {len(global_state['known_encodings'])} faces registered.")
+                return True
+            global_state["last_enrollment"] = summary
+            global_state["known_encodings"] = encoding_store.encodings()
+            global_state["known_names"] = {
+                s["_id"]: (s.get("userId") or {}).get("name", "Unknown") for s in global_state["students"]
+            }
+            print(f"[INIT] Enrollment ({'full' if full else 'delta'}): {summary['encoded']} encoded, {summary['reused']} cached, "
+                  f"{len(summary['failed'])} failed, {len(summary['removed'])} removed.")
+
+            global_state["face_index"] = FaceIndex(global_state["known_encodings"])
+            for session in list(global_state["sessions"].values()):
+                session["index"] = global_state["face_index"].subset(session["students"])
+                push_session_index(session)
+            if CAMPUS_INDEX_ENABLED:
+                update_campus_index()
+
+            print(f"[INIT] Sync Complete! {len(global_state['known_encodings'])} faces registered. Ready for Real-Time CV.")
+            return True
+        except Exception as e:
+            print(f"[INIT ERROR] Could not sync with backend: {e}")
+            return False
+
+def initial_sync():
+    if not sync_backend_data(full=True):
+        raise RuntimeError("backend sync failed")
+
+def warm_up_models():
+    """Load dlib/FaceMesh and run one dummy pass before the first camera needs them."""
+    from camera_pipeline import warm_up
+    print(f"[INIT] Models warmed up in {warm_up(CAPTURE_WIDTH, CAPTURE_HEIGHT):.1f}s")
+
+def camera_capture_thread(cam_info, stop):
+    """Dedicated thread for fetching frames from a specific camera, until stop is set"""
     cam_id = cam_info["_id"]
-    source = cam_info["streamUrl"]
-    
-    # If source is '0' or '1' etc, convert to int for webcam
-    if source.isdigit():
-        source = int(source)
-        
-    cap = cv2.VideoCapture(source)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    # Opens lazily and reconnects with backoff; '0', '1', ... are local webcams
+    source = CameraSource(cam_info["streamUrl"], CAPTURE_FPS, CAPTURE_WIDTH, CAPTURE_HEIGHT)
+    global_state["camera_streams"][cam_id] = source
+    broadcaster = get_broadcaster(cam_id)
     
     print(f"[CAM] Started capture for {cam_info['name']} ({cam_id})")
     
-    while global_state["mocking_active"]:
-        success, frame = cap.read()
-        if not success:
-            time.sleep(0.01)
+    ring = FrameRing()
+    global_state["raw_frames"][cam_id] = ring
+    displays = [None, None]  # Annotated copies, alternated so latest_frames readers never see a half-drawn frame
+    
+    while not stop.is_set():
+        if CAPTURE_FPS:
+            source.target_fps = max(CAPTURE_FPS, VIEWER_CAPTURE_FPS) if broadcaster.viewers and CAPTURE_FPS else CAPTURE_FPS
+        # Drain the stream, decoding straight into the ring's next slot only when a frame is due
+        raw = source.read(ring.write_buffer())
+        if raw is None:
             continue
+        STAGE_SECONDS.observe(source.last_decode_seconds, camera=cam_id, stage="decode")
+        FRAMES_CAPTURED.inc(camera=cam_id)
             
-        global_state["raw_frames"][cam_id] = frame.copy()
+        frame_id = ring.commit(raw)
+        supervisor = global_state["worker_supervisor"]
+        if supervisor is not None:
+            supervisor.publish_frame(cam_id, raw, frame_id, time.time())
+        slot = frame_id % 2
+        if displays[slot] is None or displays[slot].shape != raw.shape:
+            displays[slot] = np.empty_like(raw)
+        frame = displays[slot]
+        np.copyto(frame, raw)
         
         # Live session info overlay
-        session = global_state.get("current_session")
+        session = session_for_camera(cam_id)
         if session:
-            elapsed = int(time.time() - global_state.get("session_start_time", time.time()))
+            elapsed = int(time.time() - session["startedAt"])
             mins, secs = divmod(elapsed, 60)
             cv2.putText(frame, f"{cam_info['name']} | LIVE | {mins:02d}:{secs:02d}", (20, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 100), 2)
         else:
@@ -135,10 +434,10 @@ def camera_capture_thread(cam_info):
             cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
             cv2.putText(frame, b["name"], (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
             
-        # Draw recent detections (Global)
+        # Draw recent detections for this camera's session
         y_offset = 70
         current_time = time.time()
-        for d in reversed(global_state.get("recent_detections", [])):
+        for d in reversed(session["recent_detections"] if session else []):
             if current_time - d["time"] < 6:
                 name = global_state["known_names"].get(d["student"], "Unknown")
                 active = [k for k, v in d["signals"].items() if v]
@@ -147,179 +446,252 @@ def camera_capture_thread(cam_info):
                     y_offset += 25
 
         global_state["latest_frames"][cam_id] = frame
+        broadcaster.publish(frame)
         
-    cap.release()
+    source.release()
+    if global_state["camera_streams"].get(cam_id) is source:
+        del global_state["camera_streams"][cam_id]
+    broadcaster.reset()
     print(f"[CAM] Camera Thread Stopped for {cam_id}")
 
 
-def ai_processing_thread(cam_info):
+def box_label(box):
+    if box["studentId"]:
+        return global_state['known_names'].get(box["studentId"], "Unknown!")
+    if box.get("visitorId"):
+        return f"{global_state['known_names'].get(box['visitorId'], 'Unknown!')} (other room)"
+    return "Unknown"
+
+
+def apply_pipeline_result(cam_info, session, result, current_time):
+    """Apply one CameraPipeline result (from a thread or a worker process) to shared state."""
+    cam_id = cam_info["_id"]
+    for stage, seconds in result.get("timings", {}).items():
+        STAGE_SECONDS.observe(seconds, camera=cam_id, stage=stage)
+    if result["recognized"]:
+        for student_id in result["detected"]:
+            if student_id in session["students"]:
+                global_state["presence_tracker"].seen(session["classSessionId"], student_id, current_time)  # Reset absent timer
+ 
+                # Track first-seen time for participation 60% rule
+                if student_id not in session["presence_start"]:
+                    session["presence_start"][student_id] = current_time
+                    print(f"[AI] First detection for {global_state['known_names'].get(student_id)} on {cam_info['name']}")
+
+    for box in result["boxes"]:
+        visitor_id = box.get("visitorId")
+        if visitor_id and visitor_id not in session["visitors"]:
+            session["visitors"][visitor_id] = current_time
+            print(f"[AI] {global_state['known_names'].get(visitor_id)} (not on this roster) seen on {cam_info['name']}")
+
+    global_state["ai_boxes"][cam_id] = [
+        {"box": b["box"], "name": box_label(b)}
+        for b in result["boxes"]
+    ]
+
+    for event in result["events"]:
+        global_state["event_uploader"].submit({
+            "studentId": event["studentId"],
+            "cameraId": cam_id,
+            "classSessionId": session["classSessionId"],
+            "signals": event["signals"]
+        })
+        
+        if any(event["signals"].values()):
+            session["recent_detections"].append({
+                "student": event["studentId"],
+                "time": current_time,
+                "signals": event["signals"]
+            })
+            session["recent_detections"] = session["recent_detections"][-5:]
+
+
+def record_frame_latency(cam_id, frame_id, last_frame_id, captured_at, rate=None):
+    stats = global_state["frame_stats"].setdefault(cam_id, {"processed": 0, "skipped": 0, "lastLatencyMs": 0.0, "avgLatencyMs": 0.0})
+    if rate is not None:
+        stats["rateHz"] = rate  # Current motion-gated inference rate
+    if last_frame_id:
+        skipped = max(0, frame_id - last_frame_id - 1)
+        stats["skipped"] += skipped
+        FRAMES_SKIPPED.inc(skipped, camera=cam_id)
+    # End-to-end latency from capture to the end of inference on that frame
+    latency = time.time() - captured_at
+    FRAME_LATENCY_SECONDS.observe(latency, camera=cam_id)
+    FRAMES_PROCESSED.inc(camera=cam_id)
+    latency_ms = latency * 1000
+    stats["processed"] += 1
+    stats["lastLatencyMs"] = round(latency_ms, 1)
+    stats["avgLatencyMs"] = round(latency_ms if stats["processed"] == 1 else 0.9 * stats["avgLatencyMs"] + 0.1 * latency_ms, 1)
+
+
+def ai_processing_thread(cam_info, stop):
     """Runs heavy deep learning separately so the camera feed doesn't lag.
-       Each thread owns its own FaceMesh instance for thread-safety.
+       Each thread owns its own CameraPipeline (and FaceMesh) for thread-safety.
     """
+    from camera_pipeline import CameraPipeline  # Already loaded by the startup warm-up
     cam_id = cam_info["_id"]
-    last_event_times = {}
-    
-    # Create a per-thread FaceMesh — MediaPipe is NOT thread-safe
-    local_face_mesh = mp_face_mesh.FaceMesh(
-        max_num_faces=5, refine_landmarks=True,
-        min_detection_confidence=0.5, min_tracking_confidence=0.5
-    )
+    pipeline = CameraPipeline(cam_id)
     
     print(f"[AI] Started processing for {cam_info['name']} ({cam_id})")
     
-    last_face_rec_time = 0
-    cached_detected_students = []
-    cached_new_boxes = []
+    last_frame_id = 0
+    last_processed_id = 0
+    frame = None  # Reused copy-out buffer
     
-    while global_state["mocking_active"]:
-        frame = global_state["raw_frames"].get(cam_id)
-        if frame is None:
+    while not stop.is_set():
+        session = session_for_camera(cam_id)
+        if not session or not session.get("students"):
             time.sleep(0.1)
             continue
             
-        session = global_state["current_session"]
-        if not session or not session.get("students"):
-            time.sleep(0.1)
+        ring = global_state["raw_frames"].get(cam_id)
+        latest = ring.read_latest(last_frame_id, out=frame) if ring else None
+        if latest is None:
+            # Nothing new since the last pass; don't re-run the models on the same image
+            time.sleep(0.01)
             continue
+        frame_id, captured_at, frame = latest
+        last_frame_id = frame_id
             
         current_time = time.time()
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # 1. Face Recognition
-        # Run face recognition only once per second to reduce lag
-        if current_time - last_face_rec_time > 1.0:
-            small_frame = cv2.resize(rgb_frame, (0, 0), fx=0.25, fy=0.25)
-            face_locations = face_recognition.face_locations(small_frame, model="hog")
-            face_encodings = face_recognition.face_encodings(small_frame, face_locations)
-            
-            detected_students = []
-            new_boxes = []
-            for face_encoding, face_loc in zip(face_encodings, face_locations):
-                top, right, bottom, left = [coord * 4 for coord in face_loc]
-                
-                matches = face_recognition.compare_faces(list(global_state["known_encodings"].values()), face_encoding, tolerance=0.55)
-                student_id = None
-                
-                if True in matches:
-                    first_match_index = matches.index(True)
-                    student_id = list(global_state["known_encodings"].keys())[first_match_index]
-                    if student_id in session["students"]:
-                        detected_students.append(student_id)
-                        global_state["unseen_timers"][student_id] = current_time  # Reset absent timer
-     
-                        # Track first-seen time for participation 60% rule
-                        if student_id not in global_state["presence_start"]:
-                            global_state["presence_start"][student_id] = current_time
-                            print(f"[AI] First detection for {global_state['known_names'].get(student_id)} on {cam_info['name']}")
-                
-                name_display = global_state['known_names'].get(student_id, "Unknown!") if student_id else "Unknown"
-                new_boxes.append({"box": (top, right, bottom, left), "name": name_display})
-                
-            global_state["ai_boxes"][cam_id] = new_boxes
-            cached_detected_students = detected_students
-            cached_new_boxes = new_boxes
-            last_face_rec_time = current_time
-        else:
-            detected_students = cached_detected_students
-            global_state["ai_boxes"][cam_id] = cached_new_boxes
-            
-        # 2. Check 30s absent rule (Global check, but we only run it from ONE thread to avoid duplication)
-        # We'll use the first camera in the session list as the 'authority' for absent marking
-        authority_cam_id = session.get("authority_camera_id")
-        if cam_id == authority_cam_id:
-            for sid in session["students"]:
-                last_seen = global_state["unseen_timers"].get(sid, current_time)
-                if current_time - last_seen > 30:
-                    print(f"[AI] Student {global_state['known_names'].get(sid)} missing 30s! Marking absent.")
-                    try:
-                        requests.post(ABSENT_URL, json={"studentId": sid, "classSessionId": session["classSessionId"]}, timeout=3)
-                    except:
-                        pass
-                    global_state["unseen_timers"][sid] = current_time  # Don't spam
-                
-        # 3. MediaPipe Behavior tracking (process primary student detected on THIS camera)
-        results = local_face_mesh.process(rgb_frame)
-        if results.multi_face_landmarks and len(detected_students) > 0:
-            primary_student = detected_students[0]
-            
-            for face_landmarks in results.multi_face_landmarks:
-                leye_v = calc_distance(face_landmarks.landmark[159], face_landmarks.landmark[145])
-                leye_h = calc_distance(face_landmarks.landmark[33], face_landmarks.landmark[133])
-                ear = leye_v / (leye_h + 1e-6)
-                is_sleeping = ear < 0.20
-                
-                mouth_v = calc_distance(face_landmarks.landmark[13], face_landmarks.landmark[14])
-                mouth_h = calc_distance(face_landmarks.landmark[78], face_landmarks.landmark[308])
-                mar = mouth_v / (mouth_h + 1e-6)
-                is_yawning = mar > 0.6
-                
-                is_laughing = (mar > 0.2 and mar < 0.5) and (mouth_h > calc_distance(face_landmarks.landmark[33], face_landmarks.landmark[263]) * 0.45)
-                
-                nose = face_landmarks.landmark[1]
-                left_cheek = face_landmarks.landmark[234]
-                right_cheek = face_landmarks.landmark[454]
-                dist_l = calc_distance(nose, left_cheek)
-                dist_r = calc_distance(nose, right_cheek)
-                ratio = dist_l / (dist_r + 1e-6)
-                is_looking_away = ratio > 2.0 or ratio < 0.5
-                
-                top_head = face_landmarks.landmark[10]
-                chin = face_landmarks.landmark[152]
-                nose = face_landmarks.landmark[1]
-                
-                face_height = chin.y - top_head.y
-                nose_to_chin = chin.y - nose.y
-                
-                # Accurately detect looking down at a phone by checking face proportions 
-                # (nose gets closer to the chin when looking down)
-                is_phone = face_height > 0.05 and (nose_to_chin / face_height) < 0.28
-                
-                signals = {
-                    "sleeping": is_sleeping,
-                    "yawning": is_yawning,
-                    "laughing": is_laughing,
-                    "phone_usage": is_phone,
-                    "looking_away": is_looking_away
-                }
-                
-                has_violation = any(signals.values())
-                
-                last_event = last_event_times.get(primary_student, 0)
-                if current_time - last_event > 5:
-                    last_event_times[primary_student] = current_time
-                    try:
-                        requests.post(EVENT_URL, json={
-                            "studentId": primary_student,
-                            "cameraId": cam_id,
-                            "classSessionId": session["classSessionId"],
-                            "signals": signals
-                        }, timeout=3)
-                    except Exception:
-                        pass
-                    
-                    if has_violation:
-                        global_state["recent_detections"].append({
-                            "student": primary_student,
-                            "time": current_time,
-                            "signals": signals
-                        })
-                        global_state["recent_detections"] = global_state["recent_detections"][-5:]
-
-        time.sleep(0.05)
+        pipeline.set_index(session["index"])
+        pipeline.set_campus_index(global_state["campus_index"])
+        # The pipeline's motion gate sets the pace (no fixed sleep): static scenes run slower
+        result = pipeline.process(frame, current_time)
+        if result is None:
+            continue
+        apply_pipeline_result(cam_info, session, result, current_time)
+
+        record_frame_latency(cam_id, frame_id, last_processed_id, captured_at, result["rate"])
+        last_processed_id = frame_id
         
-    local_face_mesh.close()
-    global_state["active_cam_threads"].discard(cam_id)
+    pipeline.close()
     print(f"[AI] DL Processing Thread Stopped for {cam_id}")
 
-def generate_video_stream(cam_id):
+
+def camera_priority(cam_id, session):
+    # The session's authority camera gets a head start in the scheduler queue
+    return 1 if cam_id == session.get("authority_camera_id") else 0
+
+
+def schedule_camera(cam_info, session):
+    """Scheduled mode: register a camera's pipeline with the shared inference scheduler."""
+    from camera_pipeline import CameraPipeline  # Already loaded by the startup warm-up
+    cam_id = cam_info["_id"]
+    state = {"last_processed_id": 0}
+
+    def frames():
+        current = session_for_camera(cam_id)
+        if not current or not current.get("students"):
+            return None
+        return global_state["raw_frames"].get(cam_id)
+
+    def on_result(result, frame_id, captured_at):
+        current = session_for_camera(cam_id)
+        if not current:
+            return
+        current_time = time.time()
+        apply_pipeline_result(cam_info, current, result, current_time)
+        record_frame_latency(cam_id, frame_id, state["last_processed_id"], captured_at, result["rate"])
+        state["last_processed_id"] = frame_id
+
+    priority = camera_priority(cam_id, session)
+    get_scheduler().add_camera(cam_id, frames, CameraPipeline(cam_id, session["index"], campus_index=global_state["campus_index"]), on_result, priority)
+    print(f"[AI] Scheduled processing for {cam_info['name']} ({cam_id}), priority {priority}")
+
+
+def worker_results_thread():
+    """Process mode: apply results coming back from the camera worker processes."""
+    last_frame_ids = {}
     while True:
-        frame = global_state["latest_frames"].get(cam_id)
-        if frame is None:
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(frame, f"Waiting for {cam_id}...", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-        time.sleep(0.033)  # ~30fps cap
+        result = global_state["worker_supervisor"].get_result()
+        if result is None:
+            continue
+        session = session_for_camera(result["cameraId"])
+        cam_info = next((c for c in (session or {}).get("active_cameras", []) if c["_id"] == result["cameraId"]), None)
+        if cam_info is None:
+            continue
+        apply_pipeline_result(cam_info, session, result, time.time())
+        cam_id = result["cameraId"]
+        record_frame_latency(cam_id, result["frameId"], last_frame_ids.get(cam_id, 0), result["capturedAt"], result["rate"])
+        last_frame_ids[cam_id] = result["frameId"]
+
+
+def start_camera(cam_info, session):
+    """Start capture + inference for one camera on behalf of a session."""
+    cam_id = cam_info["_id"]
+    stop = threading.Event()
+    global_state["camera_stops"][cam_id] = stop
+    global_state["camera_sessions"][cam_id] = session["classSessionId"]
+    if AI_EXECUTION_MODE == "process":
+        get_worker_supervisor().start_camera(cam_id, session_roster_encodings(session["students"]))
+    elif AI_EXECUTION_MODE == "scheduled":
+        schedule_camera(cam_info, session)
+    threading.Thread(target=camera_capture_thread, args=(cam_info, stop), daemon=True).start()
+    if AI_EXECUTION_MODE == "thread":
+        threading.Thread(target=ai_processing_thread, args=(cam_info, stop), daemon=True).start()
+
+
+def stop_camera(cam_id):
+    """Stop one camera's threads/worker and drop its frames; other cameras keep running."""
+    stop = global_state["camera_stops"].pop(cam_id, None)
+    if stop is not None:
+        stop.set()
+    global_state["camera_sessions"].pop(cam_id, None)
+    if global_state["worker_supervisor"] is not None:
+        global_state["worker_supervisor"].stop_camera(cam_id)
+    if global_state["scheduler"] is not None:
+        global_state["scheduler"].remove_camera(cam_id)
+    for key in ("latest_frames", "raw_frames", "frame_stats", "ai_boxes"):
+        global_state[key].pop(cam_id, None)
+    if cam_id in global_state["broadcasters"]:
+        global_state["broadcasters"][cam_id].reset()
+
+
+def create_session(class_session_id, classroom_id, student_ids, cameras):
+    """Register a session; its cameras are started (or handed over) by the caller."""
+    session = {
+        "classSessionId": class_session_id,
+        "classroomId": classroom_id,
+        "authority_camera_id": cameras[0]["_id"],
+        "students": student_ids,
+        "active_cameras": cameras,
+        "startedAt": time.time(),
+        "index": global_state["face_index"].subset(student_ids),
+        "presence_start": {},
+        "visitors": {},  # { studentId: first seen } for enrolled students from other rosters
+        "recent_detections": []
+    }
+    global_state["sessions"][class_session_id] = session
+    return session
+
+
+def end_session(class_session_id, keep_cameras=()):
+    """Stop tracking one session and its cameras (except keep_cameras, being handed over)."""
+    session = global_state["sessions"].pop(class_session_id, None)
+    if session is None:
+        return None
+    global_state["presence_tracker"].end_session(class_session_id)
+    for cam in session["active_cameras"]:
+        cam_id = cam["_id"]
+        if cam_id not in keep_cameras and global_state["camera_sessions"].get(cam_id) == class_session_id:
+            stop_camera(cam_id)
+    print(f"[SESSION] Ended {class_session_id} (classroom {session['classroomId']}).")
+    return session
+
+
+def session_summary(session):
+    return {
+        "classSessionId": session["classSessionId"],
+        "classroomId": session["classroomId"],
+        "authority_camera_id": session["authority_camera_id"],
+        "students": session["students"],
+        "cameras": [{"id": c["_id"], "name": c["name"]} for c in session["active_cameras"]],
+        "elapsedSeconds": int(time.time() - session["startedAt"]),
+        "present": len(session["presence_start"]),
+        "visitors": list(session["visitors"]),
+        "tracked": global_state["presence_tracker"].tracked(session["classSessionId"])
+    }
 
 @app.route('/video_feed')
 def video_feed():
@@ -327,10 +699,21 @@ def video_feed():
     if not cam_id:
         # Fallback to first available or error
         cam_id = next(iter(global_state["latest_frames"].keys()), "None")
-    return Response(generate_video_stream(cam_id), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(get_broadcaster(cam_id).stream(f"Waiting for {cam_id}..."), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/video_mosaic')
+def video_mosaic():
+    """All cameras of a session (classSessionId), a classroom (classroomId) or every session, tiled."""
+    broadcaster = get_mosaic(request.args.get("classSessionId"), request.args.get("classroomId"))
+    return Response(broadcaster.stream("Waiting for cameras..."), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/start-mocking', methods=['POST'])
 def start_mocking():
+    # Models and the first roster sync must be done; a deploy restart answers 503 until then
+    wait = min(max(request.args.get("wait", READY_WAIT_SECONDS, type=float), 0.0), READY_WAIT_SECONDS)
+    if not STARTUP.wait(timeout=wait):
+        return jsonify({"error": "AI layer is still starting up", "startup": STARTUP.summary()}), 503, {"Retry-After": "5"}
+
     # Always fetch latest data from backend before starting a session
     sync_backend_data()
     
@@ -361,34 +744,36 @@ def start_mocking():
         if student_classroom_id == classroomId:
             students_in_class.append(student_id)
 
-    print(f"[SESSION] Starting for classroom {classroomId}: {len(students_in_class)} students, {len(classroom_cameras)} cameras")
-    
-    global_state["current_session"] = {
-        "classSessionId": classSessionId,
-        "classroomId": classroomId,
-        "authority_camera_id": classroom_cameras[0]["_id"],
-        "students": students_in_class,
-        "active_cameras": classroom_cameras
-    }
-    global_state["session_start_time"] = time.time()
-    global_state["presence_start"] = {}
+    # 3. A restarted session, or a new session in the same room, replaces the old one.
+    #    Sessions in other classrooms are untouched; cameras shared with the old one keep running.
+    new_cam_ids = {c["_id"] for c in classroom_cameras}
+    for sid, previous in list(global_state["sessions"].items()):
+        if sid == classSessionId or previous["classroomId"] == classroomId:
+            end_session(sid, keep_cameras=new_cam_ids)
+
+    print(f"[SESSION] Starting for classroom {classroomId}: {len(students_in_class)} students, {len(classroom_cameras)} cameras "
+          f"({len(global_state['sessions'])} other sessions running)")
     
-    # Initialize unseen timers
-    t = time.time()
-    for sid in students_in_class:
-        global_state["unseen_timers"][sid] = t
+    session = create_session(classSessionId, classroomId, students_in_class, classroom_cameras)
     
-    global_state["mocking_active"] = True
+    # Start the absent-rule clocks
+    global_state["presence_tracker"].start_session(classSessionId, students_in_class)
     
-    # Start threads for any camera that isn't already running
+    # Start threads for any camera that isn't already running; hand running ones over
     new_threads = 0
     for cam in classroom_cameras:
         cam_id = cam["_id"]
-        if cam_id not in global_state["active_cam_threads"]:
-            global_state["active_cam_threads"].add(cam_id)
-            threading.Thread(target=camera_capture_thread, args=(cam,), daemon=True).start()
-            threading.Thread(target=ai_processing_thread, args=(cam,), daemon=True).start()
+        if cam_id in global_state["camera_stops"]:
+            owner = global_state["camera_sessions"].get(cam_id)
+            if owner != classSessionId and owner in global_state["sessions"]:
+                print(f"[WARN] Camera {cam_id} moves from session {owner} to {classSessionId}")
+            global_state["camera_sessions"][cam_id] = classSessionId
+            if global_state["scheduler"] is not None:
+                global_state["scheduler"].set_priority(cam_id, camera_priority(cam_id, session))
+        else:
+            start_camera(cam, session)
             new_threads += 1
+    push_session_index(session)
     print(f"[SESSION] AI Multi-Camera threads started. ({new_threads} new pairs, {len(classroom_cameras)} total cameras)")
         
     return jsonify({
@@ -399,35 +784,96 @@ def start_mocking():
 
 @app.route('/stop-mocking', methods=['POST'])
 def stop_mocking():
-    global_state["mocking_active"] = False
-    global_state["current_session"] = None
-    global_state["session_start_time"] = None
-    global_state["presence_start"] = {}
-    global_state["latest_frames"] = {}
-    global_state["raw_frames"] = {}
-    global_state["ai_boxes"] = {}
-    global_state["active_cam_threads"] = set()
-    print("[SESSION] Mocking stopped.")
-    return jsonify({"message": "Stopped"})
+    """Stop one session (classSessionId), every session of a classroom (classroomId), or all of them."""
+    data = request.get_json(silent=True) or {}
+    classSessionId = data.get("classSessionId")
+    classroomId = data.get("classroomId")
+    stopped = []
+    for sid, session in list(global_state["sessions"].items()):
+        if classSessionId and sid != classSessionId:
+            continue
+        if classroomId and session["classroomId"] != classroomId:
+            continue
+        end_session(sid)
+        stopped.append(sid)
+    if not classSessionId and not classroomId:
+        # Full stop: also catch cameras left without a session
+        for cam_id in list(global_state["camera_stops"]):
+            stop_camera(cam_id)
+    print(f"[SESSION] Mocking stopped for {len(stopped)} session(s); {len(global_state['sessions'])} still running.")
+    return jsonify({"message": "Stopped", "sessions": stopped})
+
+def campus_index_summary():
+    index = global_state["campus_index"]
+    if index is None:
+        return None
+    return {"faces": len(index), "cells": len(index.centroids), "nprobe": index.nprobe}
 
 @app.route('/status', methods=['GET'])
 def status():
-    session = global_state.get("current_session")
-    elapsed = 0
-    if session and global_state.get("session_start_time"):
-        elapsed = int(time.time() - global_state["session_start_time"])
+    sessions = {sid: session_summary(s) for sid, s in list(global_state["sessions"].items())}
     return jsonify({
-        "active": global_state["mocking_active"],
-        "session": session,
-        "elapsedSeconds": elapsed,
-        "knownFaces": len(global_state["known_encodings"])
+        "active": bool(sessions),
+        "ready": STARTUP.ready(),
+        "startup": STARTUP.summary(),
+        "sessions": sessions,
+        "knownFaces": len(global_state["known_encodings"]),
+        "campusIndex": campus_index_summary(),
+        "sync": global_state["last_sync"],
+        "frames": global_state["frame_stats"],
+        "cameras": {cam_id: source.health() for cam_id, source in list(global_state["camera_streams"].items())},
+        "executionMode": AI_EXECUTION_MODE,
+        "workers": global_state["worker_supervisor"].stats() if global_state["worker_supervisor"] else {},
+        "scheduler": global_state["scheduler"].stats() if global_state["scheduler"] else None,
+        "uploads": {
+            "events": global_state["event_uploader"].stats(),
+            "absences": global_state["absent_uploader"].stats()
+        }
     })
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe for deploys: 200 once every startup phase is done, 503 before."""
+    summary = STARTUP.summary()
+    return jsonify(summary), 200 if summary["ready"] else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint: per-camera stage histograms, frame and upload counters."""
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/resync', methods=['POST'])
 def resync():
-    """Force re-sync of face data from backend (call when new students are added)"""
-    sync_backend_data()
-    return jsonify({"message": "Resync complete", "faces": len(global_state["known_encodings"])})
+    """Force re-sync of face data from backend (call when new students are added; ?full=1 for a snapshot)"""
+    sync_backend_data(full=request.args.get("full") in ("1", "true"))
+    return jsonify({
+        "message": "Resync complete",
+        "faces": len(global_state["known_encodings"]),
+        "enrollment": global_state["last_enrollment"]
+    })
+
+def start():
+    """Start the node's background work: uploaders, absence clock, model warm-up and first sync.
+
+    Importing this module must have no side effects: spawned children (enrollment encoders,
+    camera workers) re-import the main script as __mp_main__ and must not sync or spawn
+    pools of their own. The server binds at once while the models warm up and the roster
+    syncs in the background; /status reports each phase, /start-mocking waits for both.
+    """
+    if global_state["started"]:
+        return
+    global_state["started"] = True
+    os.makedirs(KNOWN_FACES_DIR, exist_ok=True)
+    global_state["encoding_store"].load()
+    global_state["event_uploader"].start()
+    global_state["absent_uploader"].start()
+    global_state["presence_tracker"].start()
+    if AI_EXECUTION_MODE == "process":
+        STARTUP.mark("models", READY, note="loaded by each camera worker process")
+    else:
+        STARTUP.run("models", warm_up_models)
+    STARTUP.run("sync", initial_sync)
 
 if __name__ == '__main__':
+    start()
     app.run(port=5001, debug=True, use_reloader=False)
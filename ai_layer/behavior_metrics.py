@@ -0,0 +1,142 @@
+"""Vectorized behavior metrics on FaceMesh landmarks.
+
+multi_face_landmarks is converted once per frame into an (n_faces, 478, 3) array and every
+metric for every face is computed with array ops. Works offline on saved landmark arrays:
+
+    python behavior_metrics.py landmarks.npy
+"""
+import sys
+
+import numpy as np
+
+SIGNALS = ("sleeping", "yawning", "laughing", "phone_usage", "looking_away")
+
+# FaceMesh landmark indices
+LEFT_EYE_TOP, LEFT_EYE_BOTTOM = 159, 145
+LEFT_EYE_OUTER, LEFT_EYE_INNER = 33, 133
+RIGHT_EYE_OUTER = 263
+MOUTH_TOP, MOUTH_BOTTOM = 13, 14
+MOUTH_LEFT, MOUTH_RIGHT = 78, 308
+NOSE_TIP = 1
+LEFT_CHEEK, RIGHT_CHEEK = 234, 454
+HEAD_TOP, CHIN = 10, 152
+
+DEFAULT_THRESHOLDS = {
+    "sleeping_ear": 0.20,         # Eye aspect ratio below this = eyes closed
+    "yawning_mar": 0.6,           # Mouth aspect ratio above this = yawning
+    "laughing_mar_min": 0.2,
+    "laughing_mar_max": 0.5,
+    "laughing_width": 0.45,       # Mouth width relative to eye span
+    "looking_away_ratio": 2.0,    # Nose-cheek asymmetry (and its inverse)
+    "phone_min_face_height": 0.05,
+    "phone_nose_chin": 0.28,      # Nose gets closer to the chin when looking down
+}
+
+# Consecutive frames a raw signal must hold before it is reported
+DEFAULT_MIN_FRAMES = {
+    "sleeping": 3,
+    "yawning": 1,
+    "laughing": 1,
+    "phone_usage": 1,
+    "looking_away": 1,
+}
+
+
+def landmarks_to_array(multi_face_landmarks):
+    """(n_faces, n_landmarks, 3) float32 array of normalized x, y, z."""
+    if not multi_face_landmarks:
+        return np.empty((0, 478, 3), dtype=np.float32)
+    return np.array(
+        [[(p.x, p.y, p.z) for p in face.landmark] for face in multi_face_landmarks],
+        dtype=np.float32,
+    )
+
+
+def face_boxes(landmarks, width, height):
+    """(top, right, bottom, left) pixel boxes for every face."""
+    mins = landmarks[:, :, :2].min(axis=1)
+    maxs = landmarks[:, :, :2].max(axis=1)
+    return [
+        (int(y0 * height), int(x1 * width), int(y1 * height), int(x0 * width))
+        for (x0, y0), (x1, y1) in zip(mins, maxs)
+    ]
+
+
+def _dist(xy, a, b):
+    return np.linalg.norm(xy[:, a] - xy[:, b], axis=1)
+
+
+def compute_metrics(landmarks):
+    """Raw per-face metrics as arrays of shape (n_faces,)."""
+    xy = landmarks[:, :, :2].astype(np.float64)
+    mouth_h = _dist(xy, MOUTH_LEFT, MOUTH_RIGHT)
+    face_height = xy[:, CHIN, 1] - xy[:, HEAD_TOP, 1]
+    return {
+        "ear": _dist(xy, LEFT_EYE_TOP, LEFT_EYE_BOTTOM) / (_dist(xy, LEFT_EYE_OUTER, LEFT_EYE_INNER) + 1e-6),
+        "mar": _dist(xy, MOUTH_TOP, MOUTH_BOTTOM) / (mouth_h + 1e-6),
+        "mouth_width": mouth_h,
+        "eye_span": _dist(xy, LEFT_EYE_OUTER, RIGHT_EYE_OUTER),
+        "yaw_ratio": _dist(xy, NOSE_TIP, LEFT_CHEEK) / (_dist(xy, NOSE_TIP, RIGHT_CHEEK) + 1e-6),
+        "face_height": face_height,
+        "nose_chin": (xy[:, CHIN, 1] - xy[:, NOSE_TIP, 1]) / np.where(face_height == 0, 1e-6, face_height),
+    }
+
+
+def classify(metrics, thresholds=DEFAULT_THRESHOLDS):
+    """Raw boolean signals, one (n_faces,) array per signal name."""
+    t = thresholds
+    mar = metrics["mar"]
+    return {
+        "sleeping": metrics["ear"] < t["sleeping_ear"],
+        "yawning": mar > t["yawning_mar"],
+        "laughing": (mar > t["laughing_mar_min"]) & (mar < t["laughing_mar_max"])
+                    & (metrics["mouth_width"] > metrics["eye_span"] * t["laughing_width"]),
+        "phone_usage": (metrics["face_height"] > t["phone_min_face_height"]) & (metrics["nose_chin"] < t["phone_nose_chin"]),
+        "looking_away": (metrics["yaw_ratio"] > t["looking_away_ratio"]) | (metrics["yaw_ratio"] < 1.0 / t["looking_away_ratio"]),
+    }
+
+
+def signal_matrix(landmarks, thresholds=DEFAULT_THRESHOLDS):
+    """(n_faces, len(SIGNALS)) boolean matrix of raw signals."""
+    raw = classify(compute_metrics(landmarks), thresholds)
+    return np.stack([raw[name] for name in SIGNALS], axis=1) if len(landmarks) else np.zeros((0, len(SIGNALS)), dtype=bool)
+
+
+class BehaviorSmoother:
+    """Temporal smoothing per student: a signal is reported only after it has held for
+    min_frames consecutive frames (e.g. sleeping only after N closed-eye frames)."""
+
+    def __init__(self, min_frames=DEFAULT_MIN_FRAMES, max_idle=10.0):
+        self.required = np.array([min_frames[name] for name in SIGNALS])
+        self.max_idle = max_idle
+        self.runs = {}       # { student_id: consecutive-frame counts per signal }
+        self.last_seen = {}
+
+    def update(self, student_id, raw_row, now):
+        """Feed one frame's raw signals for a student; returns the smoothed signals dict."""
+        runs = self.runs.get(student_id)
+        if runs is None or now - self.last_seen.get(student_id, now) > self.max_idle:
+            runs = np.zeros(len(SIGNALS), dtype=np.int64)
+        runs = (runs + 1) * np.asarray(raw_row, dtype=bool)
+        self.runs[student_id] = runs
+        self.last_seen[student_id] = now
+        return {name: bool(v) for name, v in zip(SIGNALS, runs >= self.required)}
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python behavior_metrics.py landmarks.npy  (array of shape (n_frames or n_faces, 478, 3))")
+        sys.exit(1)
+    landmarks = np.load(sys.argv[1])
+    if landmarks.ndim == 2:
+        landmarks = landmarks[None]
+    metrics = compute_metrics(landmarks)
+    raw = signal_matrix(landmarks)
+    for i in range(len(landmarks)):
+        active = [name for name, v in zip(SIGNALS, raw[i]) if v]
+        print(f"[{i}] ear={metrics['ear'][i]:.3f} mar={metrics['mar'][i]:.3f} yaw={metrics['yaw_ratio'][i]:.2f} "
+              f"nose_chin={metrics['nose_chin'][i]:.2f} -> {','.join(active) or 'attentive'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""Offline replay benchmark for the AI layer's CV pipeline.
+
+Feeds recorded video files (or image sequences) through the same path as a live session,
+capture into a FrameRing -> CameraPipeline (motion gate, HOG/dlib recognition, FaceMesh,
+behavior metrics) -> apply_pipeline_result -> bulk event uploader, against a local stub
+backend that enrolls the photos in known_faces/. No webcams or Node backend required.
+The run works in a scratch directory, so the photos are only read: downloads and the
+encoding cache go to a temporary known_faces/ that is removed afterwards.
+
+Frames are stamped with a virtual clock (frame index / fps), so gating, recognition
+cadence and event throttling are the same on every run of the same input.
+
+    cd ai_layer
+    python benchmarks/replay_benchmark.py --video clips/room1.mp4 --video clips/room2.mp4 --output bench.json
+"""
+import argparse
+import atexit
+import glob
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+AI_LAYER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_LAYER_DIR)
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+from benchmarks.stub_backend import BENCH_CLASSROOM_ID, StubBackend, students_from_known_faces  # noqa: E402
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class ImageSequence:
+    """cv2.VideoCapture-like reader over a directory of images (sorted by name)."""
+
+    def __init__(self, directory):
+        self.paths = sorted(p for p in glob.glob(os.path.join(directory, "*")) if p.lower().endswith(IMAGE_EXTENSIONS))
+        self.index = 0
+
+    def read(self, image=None):
+        if self.index >= len(self.paths):
+            return False, None
+        frame = cv2.imread(self.paths[self.index])
+        self.index += 1
+        return frame is not None, frame
+
+    def get(self, prop):
+        return 0
+
+    def release(self):
+        pass
+
+
+def open_source(path):
+    return ImageSequence(path) if os.path.isdir(path) else cv2.VideoCapture(path)
+
+
+def percentiles(samples_s):
+    if not samples_s:
+        return None
+    ms = np.asarray(samples_s) * 1000
+    return {
+        "count": int(ms.size),
+        "mean": round(float(ms.mean()), 3),
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p90": round(float(np.percentile(ms, 90)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+def resource_usage():
+    """Process CPU seconds and peak/current RSS (psutil if installed, else resource)."""
+    usage = {"cpuSeconds": round(time.process_time(), 3)}
+    try:
+        import psutil
+        mem = psutil.Process().memory_info()
+        usage["rssMB"] = round(mem.rss / 2 ** 20, 1)
+        return usage
+    except ImportError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        usage["peakRssMB"] = round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+    except ImportError:
+        pass
+    return usage
+
+
+def replay_camera(app_module, cam_info, session, args, report):
+    """Run one recorded source through capture -> pipeline -> event path."""
+    from camera_pipeline import CameraPipeline
+    from frame_ring import FrameRing
+
+    cap = open_source(cam_info["streamUrl"])
+    fps = args.fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+    ring = FrameRing()
+    pipeline = CameraPipeline(cam_info["_id"], session["index"])
+    stages = {"capture": [], "pipeline": [], "apply": []}
+    counters = {"frames": 0, "processed": 0, "gated": 0, "recognitionPasses": 0, "events": 0}
+    frame = None
+    last_id = 0
+
+    started = time.perf_counter()
+    while args.max_frames is None or counters["frames"] < args.max_frames:
+        t0 = time.perf_counter()
+        ok, raw = cap.read(ring.write_buffer())
+        if not ok:
+            break
+        virtual_now = session["startedAt"] + counters["frames"] / fps
+        ring.commit(raw, virtual_now)
+        last_id, _, frame = ring.read_latest(last_id, out=frame)
+        t1 = time.perf_counter()
+        counters["frames"] += 1
+        if counters["frames"] <= args.warmup:
+            pipeline.process(frame, virtual_now)
+            continue
+        stages["capture"].append(t1 - t0)
+
+        result = pipeline.process(frame, virtual_now)
+        t2 = time.perf_counter()
+        if result is None:
+            counters["gated"] += 1
+            continue
+        stages["pipeline"].append(t2 - t1)
+        for stage, seconds in result["timings"].items():
+            stages.setdefault(stage, []).append(seconds)
+
+        app_module.apply_pipeline_result(cam_info, session, result, virtual_now)
+        stages["apply"].append(time.perf_counter() - t2)
+        counters["processed"] += 1
+        counters["recognitionPasses"] += int(result["recognized"])
+        counters["events"] += len(result["events"])
+    elapsed = time.perf_counter() - started
+
+    cap.release()
+    pipeline.close()
+    measured = max(counters["frames"] - args.warmup, 0)
+    report[cam_info["_id"]] = dict(
+        counters,
+        source=cam_info["streamUrl"],
+        sourceFps=fps,
+        wallSeconds=round(elapsed, 3),
+        framesPerSecond=round(measured / elapsed, 2) if elapsed else 0.0,
+        processedPerSecond=round(counters["processed"] / elapsed, 2) if elapsed else 0.0,
+        dlibEncodings=pipeline.encodings_run,
+        stagesMs={stage: percentiles(samples) for stage, samples in stages.items() if samples},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded video through the AI layer pipeline and report throughput.")
+    parser.add_argument("--video", action="append", required=True,
+                        help="Video file, image-sequence pattern (frames/%%04d.jpg) or image directory; repeat per camera")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop each camera after this many frames")
+    parser.add_argument("--warmup", type=int, default=10, help="Frames per camera excluded from the stats")
+    parser.add_argument("--fps", type=float, default=None, help="Virtual clock rate (default: the source's own fps, else 30)")
+    parser.add_argument("--sequential", action="store_true", help="Replay cameras one after another instead of concurrently")
+    parser.add_argument("--port", type=int, default=0, help="Stub backend port (default: any free port)")
+    parser.add_argument("--output", help="Write the JSON report here as well as printing it")
+    args = parser.parse_args()
+
+    videos = [os.path.abspath(v) for v in args.video]
+    output = os.path.abspath(args.output) if args.output else None
+    photos_dir = os.path.join(AI_LAYER_DIR, "known_faces")
+    # app.py keeps known_faces/ (downloads + encoding cache) relative to the working directory;
+    # never let the benchmark's sync download over, prune or rewrite the production one
+    workdir = tempfile.mkdtemp(prefix="ai-replay-")
+    atexit.register(shutil.rmtree, workdir, True)
+    os.chdir(workdir)
+
+    cameras = [
+        {"_id": f"bench-cam-{i + 1}", "name": f"Bench Cam {i + 1}", "streamUrl": path, "classroomId": BENCH_CLASSROOM_ID}
+        for i, path in enumerate(videos)
+    ]
+    stub = StubBackend(students_from_known_faces(photos_dir), cameras, port=args.port).start()
+    os.environ["AI_BACKEND_URL"] = stub.base_url
+
+    t0 = time.perf_counter()
+    import app as app_module
+    app_module.start()  # Warms up the models and syncs against the stub in the background
+    if not app_module.STARTUP.wait(timeout=600):
+        raise SystemExit(f"AI layer did not become ready: {app_module.STARTUP.summary()}")
+    startup_seconds = time.perf_counter() - t0
+
+    state = app_module.global_state
+    students = [s["_id"] for s in state["students"]]
+    session = app_module.create_session("bench-session", BENCH_CLASSROOM_ID, students, cameras)
+
+    report = {}
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+    if args.sequential:
+        for cam in cameras:
+            replay_camera(app_module, cam, session, args, report)
+    else:
+        threads = [threading.Thread(target=replay_camera, args=(app_module, cam, session, args, report)) for cam in cameras]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    wall = time.perf_counter() - wall_before
+    cpu = time.process_time() - cpu_before
+
+    # Let the uploader drain so the event path is part of the measurement
+    deadline = time.time() + 10
+    while state["event_uploader"].stats()["depth"] and time.time() < deadline:
+        time.sleep(0.05)
+    time.sleep(state["event_uploader"].flush_interval + 0.1)
+
+    result = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "executionMode": "replay-" + ("sequential" if args.sequential else "concurrent"),
+        },
+        "args": {k: v for k, v in vars(args).items() if k != "output"},
+        "enrolledFaces": len(state["known_encodings"]),
+        "startupSeconds": round(startup_seconds, 3),
+        "wallSeconds": round(wall, 3),
+        "cpuSeconds": round(cpu, 3),
+        "cpuUtilization": round(cpu / wall, 2) if wall else 0.0,
+        "resources": resource_usage(),
+        "cameras": report,
+        "uploader": state["event_uploader"].stats(),
+        "backend": stub.stats(),
+    }
+    stub.stop()
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
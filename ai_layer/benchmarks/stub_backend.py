@@ -0,0 +1,80 @@
+"""Minimal stand-in for the Node backend's /api/ai routes, for offline benchmarks.
+
+Serves a /ai/sync payload built from the photos in known_faces/ (one student per
+<studentId>.jpg, all in one classroom) and counts what the AI layer posts back.
+"""
+import glob
+import os
+import threading
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+BENCH_CLASSROOM_ID = "bench-classroom"
+
+
+def students_from_known_faces(known_faces_dir, classroom_id=BENCH_CLASSROOM_ID):
+    students = []
+    for path in sorted(glob.glob(os.path.join(known_faces_dir, "*.jpg"))):
+        sid = os.path.splitext(os.path.basename(path))[0]
+        students.append({
+            "_id": sid,
+            "userId": {"_id": f"user-{sid}", "name": f"Student {sid[-6:]}"},
+            "classroomId": classroom_id,
+            "imageUrl": "file:///" + os.path.abspath(path).replace(os.sep, "/").lstrip("/"),
+        })
+    return students
+
+
+class StubBackend:
+    def __init__(self, students, cameras, port=5055):
+        self.students = students
+        self.cameras = cameras
+        self.counters = {"syncRequests": 0, "events": 0, "eventBatches": 0, "absences": 0, "absentBatches": 0}
+        self.lock = threading.Lock()
+        self.app = self._make_app()
+        self.server = make_server("127.0.0.1", port, self.app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/api"
+
+    def _count(self, **deltas):
+        with self.lock:
+            for key, n in deltas.items():
+                self.counters[key] += n
+
+    def _make_app(self):
+        app = Flask("stub_backend")
+
+        @app.route('/api/ai/sync', methods=['GET'])
+        def sync():
+            self._count(syncRequests=1)
+            return jsonify({
+                "classrooms": [{"_id": BENCH_CLASSROOM_ID, "name": "Benchmark Room"}],
+                "cameras": self.cameras,
+                "students": self.students,
+                "faculty": []
+            })
+
+        @app.route('/api/ai/events/bulk', methods=['POST'])
+        def events_bulk():
+            events = request.json.get("events", [])
+            self._count(events=len(events), eventBatches=1)
+            return jsonify({"success": True, "accepted": len(events), "rejected": 0}), 201
+
+        @app.route('/api/ai/absent/bulk', methods=['POST'])
+        def absent_bulk():
+            absences = request.json.get("absences", [])
+            self._count(absences=len(absences), absentBatches=1)
+            return jsonify({"success": True, "accepted": len(absences), "rejected": 0})
+
+        return app
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
@@ -0,0 +1,203 @@
+import json
+import os
+import time
+
+import cv2
+import face_recognition
+import mediapipe as mp
+import numpy as np
+
+from behavior_metrics import (DEFAULT_MIN_FRAMES, DEFAULT_THRESHOLDS, BehaviorSmoother, face_boxes,
+                              landmarks_to_array, signal_matrix)
+from face_index import FaceIndex
+from face_tracker import FaceTracker
+from motion_gate import MotionGate
+
+mp_face_mesh = mp.solutions.face_mesh
+
+RECOGNITION_INTERVAL = 1.0  # Seconds between HOG detection + encoding passes
+MATCH_TOLERANCE = 0.55
+EVENT_INTERVAL = 5.0        # Min seconds between behavior events for one student on one camera
+TRACK_AGE_MARGIN = 1.0      # Seconds a track survives past the longest recognition gap
+
+# JSON overrides, e.g. AI_BEHAVIOR_THRESHOLDS='{"sleeping_ear": 0.18}' AI_BEHAVIOR_MIN_FRAMES='{"sleeping": 5}'
+BEHAVIOR_THRESHOLDS = dict(DEFAULT_THRESHOLDS, **json.loads(os.environ.get("AI_BEHAVIOR_THRESHOLDS", "{}")))
+BEHAVIOR_MIN_FRAMES = dict(DEFAULT_MIN_FRAMES, **json.loads(os.environ.get("AI_BEHAVIOR_MIN_FRAMES", "{}")))
+
+# Per-camera inference rate bounds for the motion gate (frames per second)
+MIN_INFERENCE_RATE = float(os.environ.get("AI_MIN_INFERENCE_FPS", "1"))
+MAX_INFERENCE_RATE = float(os.environ.get("AI_MAX_INFERENCE_FPS", "20"))
+
+
+class CameraPipeline:
+    """Per-camera inference state: recognition cadence, FaceMesh instance and event throttling.
+
+    process() has no side effects on shared state, so the same code runs inside the Flask
+    process (one AI thread per camera) or inside a camera worker process; the caller
+    applies the returned result.
+    """
+
+    def __init__(self, cam_id, index=None, thresholds=BEHAVIOR_THRESHOLDS, min_frames=BEHAVIOR_MIN_FRAMES,
+                 campus_index=None):
+        self.cam_id = cam_id
+        self.index = index or FaceIndex()
+        self.campus_index = campus_index  # Optional IVFFaceIndex for faces not on the roster
+        self.thresholds = thresholds
+        self.smoother = BehaviorSmoother(min_frames)
+        self.gate = MotionGate(min_rate=MIN_INFERENCE_RATE, max_rate=MAX_INFERENCE_RATE)
+        self.last_face_count = 0
+        self.pending_index = None
+        # MediaPipe is NOT thread-safe, so every pipeline owns its own FaceMesh
+        self.face_mesh = mp_face_mesh.FaceMesh(
+            max_num_faces=5, refine_landmarks=True,
+            min_detection_confidence=0.5, min_tracking_confidence=0.5
+        )
+        # Tracks must outlive the widest gap between recognition passes: FaceMesh only refreshes
+        # max_num_faces of them in between, and an expired track costs a fresh dlib encoding
+        self.tracker = FaceTracker(max_age=self.gate.max_pass_gap(RECOGNITION_INTERVAL) + TRACK_AGE_MARGIN,
+                                   confident_distance=MATCH_TOLERANCE - 0.1)
+        self.last_face_rec_time = 0
+        self.detected_students = []
+        self.last_event_times = {}
+        self.encodings_run = 0  # dlib encodings actually computed (tracked faces are skipped)
+
+    def set_index(self, index):
+        """Queue a new roster index (session start / resync); safe to call from any thread."""
+        if index is not self.index:
+            self.pending_index = index
+
+    def set_campus_index(self, index):
+        """Swap the campus-wide index (searched under its own lock, so any thread may call this)."""
+        self.campus_index = index
+
+    def admit(self, frame, current_time):
+        """Motion gate check on its own, for callers that schedule inference themselves."""
+        return self.gate.should_run(frame, current_time)
+
+    def process(self, frame, current_time, gated=True):
+        """Run one inference pass on a BGR frame, or return None if the motion gate skips it.
+
+        Returns { "recognized": bool, "detected": [sid], "boxes": [{ "box", "studentId", "visitorId", "trackId" }],
+        "events": [{ "studentId", "signals" }], "rate", "timings": { stage: seconds } }.
+        detected is from the last recognition pass when recognized is False; boxes always
+        follow the live tracks. visitorId names an off-roster face found in the campus index.
+        """
+        if gated and not self.admit(frame, current_time):
+            return None
+        if self.pending_index is not None:
+            # Identities from the old roster can't be trusted any more
+            self.index, self.pending_index = self.pending_index, None
+            self.tracker.clear()
+
+        timings = {}  # Seconds per stage, for benchmarks and /metrics
+        t0 = time.perf_counter()
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        height, width = frame.shape[:2]
+        t1 = time.perf_counter()
+        timings["color"] = t1 - t0
+
+        results = self.face_mesh.process(rgb_frame)
+        # One (n_faces, 478, 3) array per frame; every metric below is computed on it at once
+        landmarks = landmarks_to_array(results.multi_face_landmarks)
+        mesh_boxes = face_boxes(landmarks, width, height)
+        t0 = time.perf_counter()
+        timings["facemesh"] = t0 - t1
+
+        # 1. Face Recognition
+        # Run HOG detection once per second (less often in a static scene);
+        # in between, FaceMesh boxes move the tracks
+        recognized = False
+        if current_time - self.last_face_rec_time > self.gate.recognition_interval(RECOGNITION_INTERVAL):
+            small_frame = cv2.resize(rgb_frame, (0, 0), fx=0.25, fy=0.25)
+            face_locations = face_recognition.face_locations(small_frame, model="hog")
+            t1 = time.perf_counter()
+            timings["detect"] = t1 - t0
+            tracks = self.tracker.update([tuple(coord * 4 for coord in loc) for loc in face_locations], current_time)
+            if any(t.hits == 1 for t in tracks):
+                self.gate.boost()
+
+            # Only encode faces whose track is new, unidentified, uncertain or due a re-check
+            pending = [i for i, t in enumerate(tracks) if self.tracker.needs_identification(t, current_time)]
+            if pending:
+                face_encodings = face_recognition.face_encodings(small_frame, [face_locations[i] for i in pending])
+                self.encodings_run += len(pending)
+                t2 = time.perf_counter()
+                timings["encode"] = t2 - t1
+                # Closest roster match for every face in one batched distance computation
+                unmatched = []
+                for i, encoding, (student_id, distance) in zip(
+                        pending, face_encodings, self.index.match(face_encodings, tolerance=MATCH_TOLERANCE)):
+                    self.tracker.identify(tracks[i], student_id, distance, current_time)
+                    if tracks[i].student_id is None:
+                        unmatched.append((tracks[i], encoding))
+                t3 = time.perf_counter()
+                timings["match"] = t3 - t2
+
+                # Not on this roster: look the face up across every enrolled student
+                if unmatched and self.campus_index is not None:
+                    campus = self.campus_index.match([e for _, e in unmatched], tolerance=MATCH_TOLERANCE)
+                    for (track, _), (visitor_id, _) in zip(unmatched, campus):
+                        track.visitor_id = visitor_id
+                    timings["campus_match"] = time.perf_counter() - t3
+
+            self.detected_students = [t.student_id for t in tracks if t.student_id]
+            self.last_face_rec_time = current_time
+            recognized = True
+        else:
+            self.tracker.update(mesh_boxes, current_time, spawn=False)
+
+        if len(mesh_boxes) != self.last_face_count:
+            # A face appeared or left: get back to full rate and re-run recognition soon
+            self.gate.boost()
+            self.last_face_count = len(mesh_boxes)
+
+        boxes = [
+            {"box": t.box, "studentId": t.student_id, "visitorId": t.visitor_id, "trackId": t.track_id}
+            for t in self.tracker.tracks
+        ]
+
+        # 2. MediaPipe Behavior tracking, attributed to the student tracked on each face
+        t0 = time.perf_counter()
+        events = []
+        raw_signals = signal_matrix(landmarks, self.thresholds)
+        for raw_row, student_id in zip(raw_signals, self.tracker.attribute(mesh_boxes)):
+            if not student_id:
+                continue
+            # Smoothed every frame, so e.g. sleeping needs N consecutive closed-eye frames
+            signals = self.smoother.update(student_id, raw_row, current_time)
+
+            last_event = self.last_event_times.get(student_id, 0)
+            if current_time - last_event > EVENT_INTERVAL:
+                self.last_event_times[student_id] = current_time
+                events.append({"studentId": student_id, "signals": signals})
+        timings["behavior"] = time.perf_counter() - t0
+
+        return {
+            "recognized": recognized,
+            "detected": self.detected_students,
+            "boxes": boxes,
+            "events": events,
+            "rate": round(self.gate.rate, 2),
+            "timings": timings
+        }
+
+    def close(self):
+        self.face_mesh.close()
+
+
+def warm_up(width=640, height=480):
+    """Load every model and push one synthetic frame through a full pipeline pass.
+
+    Pays the model loading and first-call allocations up front; returns the seconds taken.
+    """
+    t0 = time.perf_counter()
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    pipeline = CameraPipeline("warm-up")
+    try:
+        pipeline.process(frame, time.time(), gated=False)
+        # A blank frame has no faces, so run the encoder once on a fixed box as well
+        small = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
+        face_recognition.face_encodings(small, [(0, 40, 40, 0)])
+    finally:
+        pipeline.close()
+    return time.perf_counter() - t0
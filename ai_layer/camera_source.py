@@ -0,0 +1,166 @@
+import collections
+import time
+
+import cv2
+
+# Health states reported by CameraSource.health()
+CONNECTING = "connecting"
+STREAMING = "streaming"
+STALLED = "stalled"
+RECONNECTING = "reconnecting"
+
+
+class CameraSource:
+    """Decode-on-demand wrapper around cv2.VideoCapture with reconnection and health state.
+
+    read() grab()s every frame the source delivers, so a network stream never backs up
+    and the decoded frame is always the newest one, but only retrieve()s (the expensive
+    decode) when target_fps says a consumer is due for one. Frames larger than the target
+    resolution are scaled down to fit it. A source that fails to open or delivers nothing
+    for stall_timeout seconds is released and reopened with exponential backoff.
+    """
+
+    def __init__(self, source, target_fps=20.0, width=640, height=480,
+                 stall_timeout=3.0, reconnect_backoff=0.5, max_backoff=30.0, open_timeout=5.0):
+        # '0', '1', ... are local webcams
+        self.source = int(source) if isinstance(source, str) and source.isdigit() else source
+        self.target_fps = target_fps  # 0 decodes every frame
+        self.width = width
+        self.height = height
+        self.stall_timeout = stall_timeout
+        self.open_timeout = open_timeout
+        self.reconnect_backoff = reconnect_backoff
+        self.max_backoff = max_backoff
+
+        self.cap = None
+        self.state = CONNECTING
+        self.attempts = 0            # Failed connects/stalls since the last good frame
+        self.next_attempt = 0.0
+        self.last_frame_at = 0.0
+        self.next_decode = 0.0
+        self.decoded_buffer = None   # Reused full-size decode target when scaling down
+        self.last_decode_seconds = 0.0
+        self.last_error = None
+        self.grab_times = collections.deque(maxlen=60)
+        self.decode_times = collections.deque(maxlen=60)
+        self.counters = {"grabbed": 0, "decoded": 0, "failures": 0, "reconnects": 0}
+
+    def _connect(self, now):
+        if isinstance(self.source, str) and hasattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC"):
+            # Bound connect and read inside FFmpeg, so a dead RTSP/HTTP source fails the
+            # grab() and reaches the reconnect path instead of blocking in it
+            self.cap = cv2.VideoCapture(self.source, cv2.CAP_ANY, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.open_timeout * 1000),
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.stall_timeout * 1000),
+            ])
+        else:
+            self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            self._disconnect(now, f"could not open {self.source}")
+            return False
+        if self.width and self.height:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.last_frame_at = now  # Stall clock starts at connect
+        return True
+
+    def _disconnect(self, now, reason):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self.attempts += 1
+        self.counters["reconnects"] += 1
+        self.last_error = reason
+        self.state = RECONNECTING
+        delay = min(self.reconnect_backoff * 2 ** (self.attempts - 1), self.max_backoff)
+        self.next_attempt = now + delay
+        print(f"[CAM] {self.source}: {reason}; retrying in {delay:.1f}s")
+
+    def _fit(self, shape):
+        """Target (width, height) for a frame of this shape, or None to keep it as is."""
+        h, w = shape[:2]
+        if not (self.width and self.height) or (w <= self.width and h <= self.height):
+            return None
+        scale = min(self.width / w, self.height / h)
+        return max(1, int(w * scale)), max(1, int(h * scale))
+
+    def read(self, out=None):
+        """Return the next frame worth decoding (into out when possible) or None.
+
+        None means nothing is due yet, the grab failed or the source is reconnecting; the
+        caller just loops, checking its own stop flag. Never sleeps for more than 0.1s.
+        """
+        now = time.time()
+        if self.cap is None:
+            if now < self.next_attempt:
+                time.sleep(min(self.next_attempt - now, 0.1))
+                return None
+            if not self._connect(now):
+                return None
+
+        if not self.cap.grab():
+            self.counters["failures"] += 1
+            if now - self.last_frame_at > self.stall_timeout:
+                self._disconnect(now, f"no frames for {now - self.last_frame_at:.1f}s")
+            else:
+                if self.state == STREAMING:
+                    self.state = STALLED
+                time.sleep(0.01)
+            return None
+        self.counters["grabbed"] += 1
+        self.grab_times.append(now)
+        self.last_frame_at = now
+        self.attempts = 0
+        self.state = STREAMING
+
+        if self.target_fps and now < self.next_decode:
+            return None  # Drained without decoding: nobody needs this frame
+        interval = 1.0 / self.target_fps if self.target_fps else 0.0
+        # Keep a steady cadence, but never bank decodes after a slow stretch
+        self.next_decode = max(self.next_decode + interval, now)
+
+        t0 = time.perf_counter()
+        scaling = self.decoded_buffer is not None
+        ok, decoded = self.cap.retrieve(self.decoded_buffer if scaling else out)
+        if not ok:
+            self.counters["failures"] += 1
+            return None
+        size = self._fit(decoded.shape)
+        if size is None:
+            frame = decoded.copy() if scaling else decoded
+            self.decoded_buffer = None
+        else:
+            # Oversized source: decode into our own buffer and scale into the caller's.
+            # (If decoded is out, the caller stores the scaled frame instead, so it is ours now.)
+            self.decoded_buffer = decoded
+            reusable = out is not None and out is not decoded and out.shape[1::-1] == size and out.shape[2:] == decoded.shape[2:]
+            frame = cv2.resize(decoded, size, dst=out if reusable else None, interpolation=cv2.INTER_AREA)
+        self.last_decode_seconds = time.perf_counter() - t0
+        self.counters["decoded"] += 1
+        self.decode_times.append(now)
+        return frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    @staticmethod
+    def _rate(times, now):
+        if len(times) < 2 or now - times[-1] > 2.0:
+            return 0.0
+        return (len(times) - 1) / max(times[-1] - times[0], 1e-6)
+
+    def health(self):
+        now = time.time()
+        return dict(
+            self.counters,
+            state=self.state,
+            connected=self.cap is not None,
+            lastFrameAgeS=round(now - self.last_frame_at, 2) if self.last_frame_at else None,
+            sourceFps=round(self._rate(self.grab_times, now), 2),
+            decodeFps=round(self._rate(self.decode_times, now), 2),
+            targetFps=self.target_fps,
+            retryInS=round(max(0.0, self.next_attempt - now), 1) if self.cap is None else 0.0,
+            lastError=self.last_error,
+        )
@@ -0,0 +1,239 @@
+"""Process-per-camera execution mode.
+
+Each camera's inference runs in its own worker process so HOG, dlib and MediaPipe for
+different cameras no longer share one GIL. Frames cross the process boundary through
+multiprocessing.shared_memory (no pickling); results come back as small dicts on one
+shared queue. A supervisor thread restarts workers that die.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAX_FRAME_SHAPE = (1080, 1920, 3)
+_HEADER_BYTES = 64  # frame_id, height, width, channels (int64), capture timestamp (float64), sequence (int64)
+
+# Spawn, not fork: the parent is a multi-threaded Flask process
+_ctx = multiprocessing.get_context("spawn")
+
+
+class SharedFrameSlot:
+    """Latest-frame slot in shared memory, written by capture and read by one worker.
+
+    Lock-free seqlock: the single writer makes the sequence counter odd while it copies a
+    frame in and even again when done; the reader retries when the counter was odd or moved
+    during its copy. A worker killed mid-read therefore can never block the capture thread.
+    """
+
+    def __init__(self, name=None, create=False, max_shape=MAX_FRAME_SHAPE):
+        size = _HEADER_BYTES + int(np.prod(max_shape))
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.max_shape = max_shape
+        self.header = np.ndarray((4,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self.stamp = np.ndarray((1,), dtype=np.float64, buffer=self.shm.buf, offset=32)
+        self.seq = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=40)
+        self.data = np.ndarray((int(np.prod(max_shape)),), dtype=np.uint8, buffer=self.shm.buf, offset=_HEADER_BYTES)
+        if create:
+            self.header[:] = 0
+            self.seq[0] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame, frame_id, timestamp):
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        if h * w * c > self.data.size:
+            return False
+        self.seq[0] += 1  # Odd: write in progress
+        np.copyto(self.data[:h * w * c].reshape(frame.shape), frame)
+        self.header[1:] = (h, w, c)
+        self.stamp[0] = timestamp
+        self.header[0] = frame_id
+        self.seq[0] += 1
+        return True
+
+    def read(self, after_id=0, out=None, retries=3):
+        """(frame_id, timestamp, frame) copied into out, or None if nothing newer than after_id."""
+        for _ in range(retries):
+            seq = int(self.seq[0])
+            if seq % 2:
+                time.sleep(0.001)
+                continue
+            frame_id, h, w, c = (int(v) for v in self.header)
+            timestamp = float(self.stamp[0])
+            if frame_id <= after_id:
+                if int(self.seq[0]) == seq:
+                    return None
+                continue
+            shape = (h, w, c) if c > 1 else (h, w)
+            if out is None or out.shape != shape:
+                out = np.empty(shape, dtype=np.uint8)
+            np.copyto(out, self.data[:h * w * c].reshape(shape))
+            if int(self.seq[0]) == seq:
+                return frame_id, timestamp, out
+        return None  # Writer kept overwriting the slot; the caller polls again
+
+    def close(self, unlink=False):
+        # Drop views first, SharedMemory.close() refuses while buffers are exported
+        self.header = self.stamp = self.seq = self.data = None
+        self.shm.close()
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def worker_main(cam_id, shm_name, max_shape, control, results):
+    """Worker process entry point: pull frames from shared memory, push results back."""
+    # Heavy imports happen here, in the child only
+    from camera_pipeline import CameraPipeline
+    from face_index import FaceIndex
+    from ann_index import IVFFaceIndex
+
+    slot = SharedFrameSlot(name=shm_name, max_shape=max_shape)
+    pipeline = CameraPipeline(cam_id)
+    last_frame_id = 0
+    frame = None
+    try:
+        while True:
+            try:
+                while True:
+                    msg = control.get_nowait()
+                    if msg[0] == "stop":
+                        return
+                    if msg[0] == "roster":
+                        pipeline.set_index(FaceIndex(msg[1]))
+                    if msg[0] == "campus":
+                        try:
+                            pipeline.set_campus_index(IVFFaceIndex.load(msg[1]) if msg[1] else None)
+                        except (OSError, ValueError) as e:
+                            print(f"[WORKER] {cam_id}: could not load campus index: {e}")
+            except queue.Empty:
+                pass
+
+            latest = slot.read(last_frame_id, out=frame)
+            if latest is None:
+                time.sleep(0.01)
+                continue
+            last_frame_id, captured_at, frame = latest
+            result = pipeline.process(frame, time.time())
+            if result is None:
+                continue  # Gated: static scene
+            result.update({"cameraId": cam_id, "frameId": last_frame_id, "capturedAt": captured_at})
+            results.put(result)
+    finally:
+        pipeline.close()
+        slot.close()
+
+
+class CameraWorkerSupervisor:
+    """Owns one worker process + shared frame slot per camera and restarts crashed workers."""
+
+    def __init__(self, max_shape=MAX_FRAME_SHAPE, restart_backoff=1.0, max_backoff=30.0):
+        self.max_shape = max_shape
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.results = _ctx.Queue(maxsize=256)
+        self.workers = {}  # { cam_id: { "process", "slot", "control", "restarts", "next_restart" } }
+        self.rosters = {}  # { cam_id: { sid: encoding } } of the session each camera belongs to
+        self.campus_index_path = None  # Saved IVFFaceIndex every worker loads (AI_CAMPUS_INDEX)
+        self._lock = threading.Lock()
+        self._running = True
+        threading.Thread(target=self._supervise, daemon=True).start()
+
+    def _spawn(self, cam_id, worker):
+        control = _ctx.Queue()
+        control.put(("roster", self.rosters.get(cam_id, {})))
+        if self.campus_index_path:
+            control.put(("campus", self.campus_index_path))
+        proc = _ctx.Process(
+            target=worker_main,
+            args=(cam_id, worker["slot"].name, self.max_shape, control, self.results),
+            name=f"camera-worker-{cam_id}", daemon=True
+        )
+        proc.start()
+        worker.update(process=proc, control=control)
+
+    def start_camera(self, cam_id, roster=None):
+        with self._lock:
+            if roster is not None:
+                self.rosters[cam_id] = {sid: np.asarray(enc) for sid, enc in roster.items()}
+            if cam_id in self.workers:
+                return
+            worker = {"slot": SharedFrameSlot(create=True, max_shape=self.max_shape), "restarts": 0, "next_restart": 0}
+            self.workers[cam_id] = worker
+            self._spawn(cam_id, worker)
+        print(f"[WORKER] Started inference process for {cam_id}")
+
+    def publish_frame(self, cam_id, frame, frame_id, timestamp):
+        worker = self.workers.get(cam_id)
+        if worker is not None:
+            worker["slot"].write(frame, frame_id, timestamp)
+
+    def set_roster(self, encodings, cam_ids=None):
+        """Send a session roster ({ sid: encoding }) to the given cameras' workers (default: all)."""
+        with self._lock:
+            roster = {sid: np.asarray(enc) for sid, enc in encodings.items()}
+            for cam_id in (self.workers if cam_ids is None else cam_ids):
+                self.rosters[cam_id] = roster
+                worker = self.workers.get(cam_id)
+                if worker is not None:
+                    worker["control"].put(("roster", roster))
+
+    def set_campus_index(self, path):
+        """Have every worker (re)load the campus index saved at path (None drops it)."""
+        with self._lock:
+            self.campus_index_path = path
+            for worker in self.workers.values():
+                worker["control"].put(("campus", path))
+
+    def stop_camera(self, cam_id):
+        with self._lock:
+            worker = self.workers.pop(cam_id, None)
+            self.rosters.pop(cam_id, None)
+        if worker is None:
+            return
+        worker["control"].put(("stop",))
+        worker["process"].join(timeout=3)
+        if worker["process"].is_alive():
+            worker["process"].terminate()
+        worker["slot"].close(unlink=True)
+        print(f"[WORKER] Stopped inference process for {cam_id}")
+
+    def stop_all(self):
+        for cam_id in list(self.workers):
+            self.stop_camera(cam_id)
+
+    def get_result(self, timeout=0.5):
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                cam_id: {"alive": w["process"].is_alive(), "pid": w["process"].pid, "restarts": w["restarts"]}
+                for cam_id, w in self.workers.items()
+            }
+
+    def _supervise(self):
+        while self._running:
+            time.sleep(1.0)
+            now = time.time()
+            with self._lock:
+                for cam_id, worker in self.workers.items():
+                    if worker["process"].is_alive() or now < worker["next_restart"]:
+                        continue
+                    worker["restarts"] += 1
+                    # Back off so a worker that crashes on startup doesn't spin
+                    delay = min(self.restart_backoff * 2 ** (worker["restarts"] - 1), self.max_backoff)
+                    worker["next_restart"] = now + delay
+                    print(f"[WORKER] Inference process for {cam_id} died (exit {worker['process'].exitcode}), restarting (#{worker['restarts']})")
+                    self._spawn(cam_id, worker)
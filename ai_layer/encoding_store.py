@@ -0,0 +1,145 @@
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from face_index import ENCODING_DIM
+
+NO_FACE_ROW = -1  # Photo was encoded but no face was found; don't retry until it changes
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def url_digest(url):
+    return hashlib.sha1((url or "").encode("utf-8")).hexdigest()
+
+
+class EncodingStore:
+    """Persistent face-encoding cache: a memory-mapped .npy matrix plus a JSON index.
+
+    The index maps student ID -> { "row", "sha1" (image content), "url" (imageUrl hash) },
+    so a resync only encodes students whose photo is new or has changed. Every save writes
+    a new generation-named matrix and then replaces the index that names it, so the index
+    replace is the single commit point: a crash leaves the old index with its own matrix.
+    """
+
+    def __init__(self, directory, name="encodings"):
+        self.directory = directory
+        self.name = name
+        self.index_path = os.path.join(directory, f"{name}_index.json")
+        self.entries = {}
+        self.matrix = np.empty((0, ENCODING_DIM), dtype=np.float64)
+        self.pending = {}  # { sid: encoding } not yet written to disk
+        self.dirty = False
+
+    def load(self):
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            if "matrix" not in index:
+                raise ValueError("index predates generation-named matrices")
+            matrix = np.load(os.path.join(self.directory, index["matrix"]), mmap_mode="r")
+        except (OSError, ValueError, KeyError) as e:
+            if os.path.exists(self.index_path):
+                print(f"[CACHE] Ignoring unreadable encoding cache: {e}")
+            return self
+        if index.get("rows") != len(matrix) or matrix.shape[1:] != (ENCODING_DIM,):
+            print("[CACHE] Encoding cache is inconsistent, rebuilding.")
+            return self
+        self.entries = index["entries"]
+        self.matrix = matrix
+        return self
+
+    def __contains__(self, sid):
+        return sid in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def entry(self, sid):
+        return self.entries.get(sid)
+
+    def is_current(self, sid, sha1):
+        entry = self.entries.get(sid)
+        return entry is not None and entry["sha1"] == sha1
+
+    def put(self, sid, sha1, url_hash, encoding):
+        """Record a freshly computed encoding (None when no face was found)."""
+        self.entries[sid] = {"row": NO_FACE_ROW, "sha1": sha1, "url": url_hash}
+        self.pending.pop(sid, None)
+        if encoding is not None:
+            self.pending[sid] = np.asarray(encoding, dtype=np.float64)
+        self.dirty = True
+
+    def remove(self, sid):
+        if self.entries.pop(sid, None) is not None:
+            self.pending.pop(sid, None)
+            self.dirty = True
+
+    def retain(self, sids):
+        """Drop every student not in sids; returns the removed IDs."""
+        keep = set(sids)
+        removed = [sid for sid in self.entries if sid not in keep]
+        for sid in removed:
+            self.remove(sid)
+        return removed
+
+    def get(self, sid):
+        if sid in self.pending:
+            return self.pending[sid]
+        entry = self.entries.get(sid)
+        if entry is None or entry["row"] == NO_FACE_ROW:
+            return None
+        return np.array(self.matrix[entry["row"]])
+
+    def encodings(self):
+        """{ sid: encoding } for every student with a face, copied out of the map."""
+        result = {}
+        for sid in self.entries:
+            encoding = self.get(sid)
+            if encoding is not None:
+                result[sid] = encoding
+        return result
+
+    def save(self):
+        """Compact and atomically rewrite the matrix and index if anything changed."""
+        if not self.dirty:
+            return
+        rows = []
+        entries = {}
+        for sid, entry in self.entries.items():
+            encoding = self.get(sid)
+            row = NO_FACE_ROW
+            if encoding is not None:
+                row = len(rows)
+                rows.append(encoding)
+            entries[sid] = dict(entry, row=row)
+
+        matrix = np.array(rows, dtype=np.float64).reshape(len(rows), ENCODING_DIM)
+        # Release the old map first; Windows refuses to replace a mapped file
+        self.matrix = matrix
+
+        matrix_name = f"{self.name}.{os.urandom(6).hex()}.npy"
+        tmp_index = self.index_path + ".tmp"
+        np.save(os.path.join(self.directory, matrix_name), matrix)
+        with open(tmp_index, "w") as f:
+            json.dump({"rows": len(rows), "matrix": matrix_name, "entries": entries}, f)
+        os.replace(tmp_index, self.index_path)  # Commit point
+        for stale in glob.glob(os.path.join(self.directory, f"{self.name}.*.npy")):
+            if os.path.basename(stale) != matrix_name:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass  # Still mapped elsewhere (Windows); removed by a later save
+
+        self.entries = entries
+        self.pending = {}
+        self.dirty = False
@@ -0,0 +1,159 @@
+"""Staged enrollment pipeline: threaded photo downloads feeding a process pool of dlib encoders.
+
+Used by sync_backend_data in app.py, and runnable on its own for bulk onboarding:
+
+    python enrollment.py --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import requests
+
+from encoding_store import EncodingStore, file_digest, url_digest
+
+DEFAULT_SYNC_URL = "http://localhost:5000/api/ai/sync"
+DEFAULT_DOWNLOAD_WORKERS = 8
+
+
+def encode_photo(filename):
+    """Process-pool task: first face encoding in the photo as a plain list, or None."""
+    import face_recognition  # Imported in the worker so the parent never pays for it twice
+
+    img = face_recognition.load_image_file(filename)
+    encodings = face_recognition.face_encodings(img)
+    return encodings[0].tolist() if len(encodings) > 0 else None
+
+
+def print_progress(done, total, student_id, name, status, detail=""):
+    suffix = f" ({detail})" if detail else ""
+    print(f"[ENROLL] ({done}/{total}) {name}: {status}{suffix}")
+
+
+class _Job:
+    def __init__(self, student, known_faces_dir):
+        self.sid = student.get("_id")
+        self.name = (student.get("userId") or {}).get("name", "Unknown")
+        self.image_url = student.get("imageUrl")
+        self.url_hash = url_digest(self.image_url)
+        self.filename = os.path.join(known_faces_dir, f"{self.sid}.jpg")
+        self.sha1 = None
+
+
+def _fetch(job, store):
+    """Thread-pool task: make sure the photo is on disk and hash it."""
+    entry = store.entry(job.sid)
+    # Re-download when the photo is missing or its imageUrl has changed
+    if not os.path.exists(job.filename) or (entry and entry["url"] != job.url_hash):
+        # Download beside the final file and swap it in, so an interrupted download never
+        # leaves a partial photo that later syncs would take as already fetched
+        tmp = f"{job.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            urllib.request.urlretrieve(job.image_url, tmp)
+            os.replace(tmp, job.filename)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    job.sha1 = file_digest(job.filename)
+    return job
+
+
+def enroll_students(students, store, known_faces_dir, workers=None,
+                    download_workers=DEFAULT_DOWNLOAD_WORKERS, on_progress=print_progress, prune=True):
+    """Bring the encoding store in line with the synced student list.
+
+    Downloads run on a bounded thread pool; photos that are new or changed are handed to
+    a process pool as soon as they land. Students no longer in the list are removed,
+    unless prune=False (the list is a delta and removals are the caller's job).
+    Returns a summary dict with per-student failures.
+    """
+    jobs = [_Job(s, known_faces_dir) for s in students if s.get("_id") and s.get("imageUrl")]
+    total = len(jobs)
+    summary = {"total": total, "encoded": 0, "reused": 0, "noFace": 0, "failed": {}, "removed": []}
+    done = 0
+
+    def report(job, status, detail=""):
+        nonlocal done
+        done += 1
+        if on_progress:
+            on_progress(done, total, job.sid, job.name, status, detail)
+
+    encode_pool = None
+    pending = {}  # { future: (stage, job) }
+    try:
+        with ThreadPoolExecutor(max_workers=download_workers) as io_pool:
+            for job in jobs:
+                pending[io_pool.submit(_fetch, job, store)] = ("fetch", job)
+
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, job = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        summary["failed"][job.sid] = f"{stage}: {e}"
+                        report(job, "failed", f"{stage}: {e}")
+                        continue
+
+                    if stage == "fetch":
+                        if store.is_current(job.sid, job.sha1):
+                            if store.entry(job.sid)["url"] != job.url_hash:
+                                store.put(job.sid, job.sha1, job.url_hash, store.get(job.sid))
+                            summary["reused"] += 1
+                            report(job, "cached")
+                            continue
+                        if encode_pool is None:
+                            # Spawn, not fork: the caller may be a multi-threaded Flask process
+                            encode_pool = ProcessPoolExecutor(
+                                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                            )
+                        pending[encode_pool.submit(encode_photo, job.filename)] = ("encode", job)
+                    else:
+                        store.put(job.sid, job.sha1, job.url_hash, result)
+                        if result is None:
+                            summary["noFace"] += 1
+                            report(job, "no face found")
+                        else:
+                            summary["encoded"] += 1
+                            report(job, "encoded")
+    finally:
+        if encode_pool is not None:
+            encode_pool.shutdown(cancel_futures=True)
+
+    if prune:
+        summary["removed"] = store.retain(s.get("_id") for s in students if s.get("imageUrl"))
+    store.save()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-enroll student face photos into the AI layer's encoding cache.")
+    parser.add_argument("--sync-url", default=DEFAULT_SYNC_URL, help="Backend /api/ai/sync endpoint")
+    parser.add_argument("--known-faces", default="known_faces", help="Photo and encoding cache directory")
+    parser.add_argument("--workers", type=int, default=None, help="Encoding processes (default: CPU count)")
+    parser.add_argument("--download-workers", type=int, default=DEFAULT_DOWNLOAD_WORKERS, help="Concurrent photo downloads")
+    args = parser.parse_args()
+
+    os.makedirs(args.known_faces, exist_ok=True)
+    res = requests.get(args.sync_url)
+    res.raise_for_status()
+    students = res.json().get("students", [])
+
+    started = time.time()
+    store = EncodingStore(args.known_faces).load()
+    summary = enroll_students(students, store, args.known_faces, workers=args.workers,
+                              download_workers=args.download_workers)
+
+    print(f"[ENROLL] Done in {time.time() - started:.1f}s: {summary['encoded']} encoded, {summary['reused']} cached, "
+          f"{summary['noFace']} without a face, {len(summary['failed'])} failed, {len(summary['removed'])} removed.")
+    for sid, reason in summary["failed"].items():
+        print(f"[ENROLL] FAILED {sid}: {reason}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import datetime
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class EventUploader:
+    """Bounded in-memory queue drained by a background sender into bulk backend requests.
+
+    The CV loops only ever call submit(), which never blocks: when the queue is full the
+    payload is dropped and counted. Batches go out over one keep-alive session and are
+    retried with exponential backoff on connection errors and 5xx responses; a 207 reply
+    lists the items the backend failed to apply, and only the retryable ones are resent.
+    on_post, if given, is called as on_post(seconds, outcome) after every HTTP attempt.
+    """
+
+    def __init__(self, url, batch_key, max_queue=2000, max_batch=50, flush_interval=0.5,
+                 max_retries=5, backoff=0.5, max_backoff=10.0, timeout=5, on_post=None):
+        self.url = url
+        self.batch_key = batch_key
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.on_post = on_post
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.counters = {"queued": 0, "sent": 0, "failed": 0, "dropped": 0, "retries": 0, "batches": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"uploader-{self.batch_key}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Flush what is queued (best effort within timeout) and stop the sender."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, payload):
+        """Queue one payload without blocking; returns False if it had to be dropped."""
+        payload.setdefault("timestamp", datetime.datetime.now(datetime.timezone.utc).isoformat())
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats["depth"] = self.queue.qsize()
+        return stats
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counters[key] += n
+
+    def _observe(self, started, outcome):
+        if self.on_post is not None:
+            self.on_post(time.perf_counter() - started, outcome)
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        # Coalesce whatever else arrives within the flush window
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                res = self.session.post(self.url, json={self.batch_key: batch}, timeout=self.timeout)
+                if res.status_code == 207:
+                    self._observe(started, "partial")
+                    batch = self._partial(batch, res)
+                    if not batch:
+                        return
+                elif res.status_code < 500:
+                    if res.ok:
+                        self._observe(started, "ok")
+                        self._count("sent", len(batch))
+                    else:
+                        # 4xx will not get better on retry
+                        self._observe(started, "rejected")
+                        print(f"[UPLOAD] {self.url} rejected batch of {len(batch)}: {res.status_code}")
+                        self._count("failed", len(batch))
+                    return
+                else:
+                    self._observe(started, "server_error")
+            except requests.RequestException:
+                self._observe(started, "error")
+            if attempt == self.max_retries or self._stop.is_set():
+                break
+            self._count("retries")
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+        print(f"[UPLOAD] Giving up on batch of {len(batch)} for {self.url}")
+        self._count("failed", len(batch))
+
+    def _partial(self, batch, res):
+        """Count a 207 reply's applied and permanently rejected items; returns the ones to resend."""
+        try:
+            failed = res.json().get("failed", [])
+        except ValueError:
+            failed = []
+        valid = [f for f in failed if 0 <= f.get("index", -1) < len(batch)]
+        retry = [batch[f["index"]] for f in valid if f.get("retryable", True)]
+        rejected = [f for f in valid if not f.get("retryable", True)]
+        self._count("sent", len(batch) - len(valid))
+        if rejected:
+            print(f"[UPLOAD] {self.url} rejected {len(rejected)} of {len(batch)}: {rejected[0].get('message')}")
+            self._count("failed", len(rejected))
+        return retry
+
+    def _run(self):
+        while not (self._stop.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._count("batches")
+                self._send(batch)
@@ -0,0 +1,65 @@
+import numpy as np
+
+ENCODING_DIM = 128
+
+
+class FaceIndex:
+    """Enrolled face encodings held as one contiguous matrix with an aligned ID array.
+
+    Rebuilt only when the roster changes, so every recognition tick resolves all faces
+    in a frame with a single batched distance computation.
+    """
+
+    def __init__(self, encodings=None):
+        self.ids = np.empty(0, dtype=object)
+        self.matrix = np.empty((0, ENCODING_DIM), dtype=np.float64)
+        self.sq_norms = np.empty(0, dtype=np.float64)
+        if encodings:
+            self.build(encodings)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, encodings):
+        """(Re)build from a { student_id: encoding } dict."""
+        ids = list(encodings.keys())
+        matrix = np.ascontiguousarray(
+            np.array([encodings[sid] for sid in ids], dtype=np.float64).reshape(len(ids), ENCODING_DIM)
+        )
+        # Swap in fully-built arrays so matcher threads never see a half-built index
+        self.ids, self.matrix, self.sq_norms = np.array(ids, dtype=object), matrix, np.einsum("ij,ij->i", matrix, matrix)
+        return self
+
+    def subset(self, student_ids):
+        """New index restricted to the given student IDs (e.g. a session roster)."""
+        wanted = set(student_ids)
+        mask = np.array([sid in wanted for sid in self.ids], dtype=bool)
+        index = FaceIndex()
+        index.ids = self.ids[mask]
+        index.matrix = np.ascontiguousarray(self.matrix[mask])
+        index.sq_norms = self.sq_norms[mask]
+        return index
+
+    def distances(self, face_encodings):
+        """Euclidean distance matrix of shape (n_faces, n_known)."""
+        queries = np.asarray(face_encodings, dtype=np.float64).reshape(-1, ENCODING_DIM)
+        sq = np.einsum("ij,ij->i", queries, queries)[:, None] + self.sq_norms[None, :] - 2.0 * (queries @ self.matrix.T)
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def match(self, face_encodings, tolerance=0.55):
+        """Best match for every face in one pass.
+
+        Returns a list of (student_id or None, distance) aligned with face_encodings.
+        """
+        n_faces = len(face_encodings)
+        if n_faces == 0:
+            return []
+        if len(self.ids) == 0:
+            return [(None, float("inf"))] * n_faces
+        dists = self.distances(face_encodings)
+        best = np.argmin(dists, axis=1)
+        best_dists = dists[np.arange(n_faces), best]
+        return [
+            (self.ids[i] if d <= tolerance else None, float(d))
+            for i, d in zip(best, best_dists)
+        ]
@@ -0,0 +1,116 @@
+import itertools
+
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """IoU between every pair of (top, right, bottom, left) boxes."""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 1] - a[:, 3]) * (a[:, 2] - a[:, 0])
+    area_b = (b[:, 1] - b[:, 3]) * (b[:, 2] - b[:, 0])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def greedy_assign(scores, min_score):
+    """Greedy one-to-one assignment on a score matrix, best pairs first."""
+    pairs = []
+    if scores.size == 0:
+        return pairs
+    used_rows, used_cols = set(), set()
+    for flat in np.argsort(-scores, axis=None):
+        r, c = np.unravel_index(flat, scores.shape)
+        if scores[r, c] < min_score:
+            break
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((int(r), int(c)))
+    return pairs
+
+
+class Track:
+    def __init__(self, track_id, box, now):
+        self.track_id = track_id
+        self.box = tuple(box)
+        self.student_id = None
+        self.visitor_id = None  # Enrolled student from another roster, via the campus index
+        self.distance = float("inf")  # Match distance of the last identification
+        self.identified_at = 0.0
+        self.last_seen = now
+        self.hits = 1
+
+
+class FaceTracker:
+    """IoU/centroid multi-face tracker that carries identities between recognition passes.
+
+    Every detection pass is associated with the existing tracks; only tracks that are new,
+    unidentified, uncertain (distance close to the tolerance) or stale need a dlib encoding.
+    FaceMesh faces are attributed to students through the same association.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=2.0, reidentify_after=10.0, confident_distance=0.45):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age                  # Seconds a track survives without a detection
+        self.reidentify_after = reidentify_after  # Seconds before a confident identity is re-checked
+        self.confident_distance = confident_distance
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, now, spawn=True):
+        """Associate detected boxes with tracks; returns the Track (or None) for every box.
+
+        spawn=False only moves existing tracks (FaceMesh boxes between recognition passes);
+        new faces get a track on the next HOG detection pass.
+        """
+        self.tracks = [t for t in self.tracks if now - t.last_seen <= self.max_age]
+        scores = iou_matrix([t.box for t in self.tracks], boxes)
+        assigned = [None] * len(boxes)
+        for r, c in greedy_assign(scores, self.iou_threshold):
+            track = self.tracks[r]
+            track.box = tuple(boxes[c])
+            track.last_seen = now
+            track.hits += 1
+            assigned[c] = track
+        for i, box in enumerate(boxes):
+            if assigned[i] is None and spawn:
+                track = Track(next(self._ids), box, now)
+                self.tracks.append(track)
+                assigned[i] = track
+        return assigned
+
+    def needs_identification(self, track, now):
+        return (
+            track.student_id is None
+            or track.distance > self.confident_distance
+            or now - track.identified_at > self.reidentify_after
+        )
+
+    def identify(self, track, student_id, distance, now):
+        track.identified_at = now
+        if student_id is None and track.student_id is not None and track.distance <= self.confident_distance:
+            # One bad encoding (blur, profile) doesn't wipe a confident identity
+            return
+        track.student_id = student_id
+        track.distance = distance
+        if student_id is not None:
+            track.visitor_id = None
+
+    def attribute(self, face_boxes):
+        """Student ID (or None) of the best-overlapping live track for each face box."""
+        scores = iou_matrix([t.box for t in self.tracks], face_boxes)
+        owners = [None] * len(face_boxes)
+        for r, c in greedy_assign(scores, self.iou_threshold):
+            owners[c] = self.tracks[r].student_id
+        return owners
+
+    def clear(self):
+        self.tracks = []
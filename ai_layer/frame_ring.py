@@ -0,0 +1,55 @@
+import threading
+import time
+
+import numpy as np
+
+
+class FrameRing:
+    """Small preallocated per-camera ring of captured frames.
+
+    The capture thread decodes straight into the next free slot (write_buffer/commit), so
+    steady-state capture allocates nothing. Every frame gets a monotonically increasing
+    frame ID and capture timestamp; consumers pass the last ID they handled to
+    read_latest() and only ever see newer frames.
+    """
+
+    def __init__(self, slots=3):
+        # The writer only touches the slot after the newest one, so 2+ slots keep readers safe
+        self.slots = max(2, slots)
+        self.buffers = [None] * self.slots
+        self.frame_ids = [0] * self.slots
+        self.timestamps = [0.0] * self.slots
+        self.latest = -1
+        self.latest_id = 0
+        self.lock = threading.Lock()
+
+    def write_buffer(self):
+        """Buffer to decode the next frame into (None until the first frame sets the size)."""
+        return self.buffers[(self.latest + 1) % self.slots]
+
+    def commit(self, frame, timestamp=None):
+        """Publish the frame just written into write_buffer(); returns its frame ID."""
+        index = (self.latest + 1) % self.slots
+        with self.lock:
+            # cap.read() only reuses the buffer if size/type match; keep whatever it returned
+            self.buffers[index] = frame
+            self.latest_id += 1
+            self.frame_ids[index] = self.latest_id
+            self.timestamps[index] = timestamp if timestamp is not None else time.time()
+            self.latest = index
+            return self.latest_id
+
+    def read_latest(self, after_id=0, out=None):
+        """Copy the newest frame into out if it is newer than after_id.
+
+        Returns (frame_id, capture_timestamp, frame) or None when nothing new arrived.
+        out is reused when its shape matches, so a consumer allocates only once.
+        """
+        with self.lock:
+            if self.latest < 0 or self.latest_id <= after_id:
+                return None
+            src = self.buffers[self.latest]
+            if out is None or out.shape != src.shape or out.dtype != src.dtype:
+                out = np.empty_like(src)
+            np.copyto(out, src)
+            return self.frame_ids[self.latest], self.timestamps[self.latest], out
@@ -0,0 +1,168 @@
+import collections
+import threading
+import time
+
+PRIORITY_HEAD_START = 0.5  # Seconds of queue-position advantage per priority level
+
+
+class _CameraJob:
+    def __init__(self, cam_id, frames, pipeline, on_result, priority):
+        self.cam_id = cam_id
+        self.frames = frames          # Callable returning the camera's FrameRing (or None)
+        self.pipeline = pipeline
+        self.on_result = on_result    # on_result(result, frame_id, captured_at)
+        self.priority = priority
+        self.busy = False
+        self.removed = False
+        self.last_frame_id = 0
+        self.last_served = 0.0
+        self.buffer = None            # Reused copy-out buffer
+        self.done_times = collections.deque(maxlen=30)
+        self.counters = {"processed": 0, "gated": 0, "stale": 0}
+
+
+class InferenceScheduler:
+    """Fixed pool of inference workers shared by every camera, under one global FPS budget.
+
+    Workers pick the camera whose turn it is (least recently served, with a head start for
+    higher priority such as the session's authority camera), always take that camera's
+    newest frame and drop it if it is already older than max_frame_age, so an overloaded
+    node sheds frames evenly instead of building a backlog. Each camera is processed by at
+    most one worker at a time, so pipelines (and their FaceMesh) are never shared.
+    """
+
+    def __init__(self, workers=2, fps_budget=40.0, max_frame_age=0.5):
+        self.fps_budget = fps_budget
+        self.max_frame_age = max_frame_age
+        self.jobs = {}
+        self.cond = threading.Condition()
+        self.running = True
+
+        self.burst = max(1.0, fps_budget / 10)
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+        self.budget_lock = threading.Lock()
+
+        self.workers = [
+            threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True) for i in range(workers)
+        ]
+        for t in self.workers:
+            t.start()
+
+    def add_camera(self, cam_id, frames, pipeline, on_result, priority=0):
+        with self.cond:
+            self.jobs[cam_id] = _CameraJob(cam_id, frames, pipeline, on_result, priority)
+            self.cond.notify_all()
+
+    def set_priority(self, cam_id, priority):
+        with self.cond:
+            if cam_id in self.jobs:
+                self.jobs[cam_id].priority = priority
+
+    def remove_camera(self, cam_id):
+        with self.cond:
+            job = self.jobs.pop(cam_id, None)
+            if job is None:
+                return
+            job.removed = True
+            if job.busy:
+                return  # The worker running it closes the pipeline when it finishes
+        job.pipeline.close()
+
+    def remove_all(self):
+        for cam_id in list(self.jobs):
+            self.remove_camera(cam_id)
+
+    def pipelines(self):
+        with self.cond:
+            return [job.pipeline for job in self.jobs.values()]
+
+    def pipeline(self, cam_id):
+        with self.cond:
+            job = self.jobs.get(cam_id)
+            return job.pipeline if job else None
+
+    def stats(self):
+        now = time.time()
+        cameras = {}
+        with self.cond:
+            for cam_id, job in self.jobs.items():
+                times = job.done_times
+                fps = 0.0
+                if len(times) > 1 and now - times[-1] < 2.0:
+                    fps = (len(times) - 1) / max(times[-1] - times[0], 1e-6)
+                cameras[cam_id] = dict(job.counters, achievedFps=round(fps, 2), priority=job.priority)
+        return {"workers": len(self.workers), "fpsBudget": self.fps_budget, "cameras": cameras}
+
+    def _take_token(self):
+        """Block until the global budget allows one more inference."""
+        while self.running:
+            with self.budget_lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.fps_budget)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.fps_budget
+            time.sleep(wait)
+        return False
+
+    def _next_job(self):
+        with self.cond:
+            while self.running:
+                best = None
+                for job in self.jobs.values():
+                    ring = job.frames()
+                    if job.busy or ring is None or ring.latest_id <= job.last_frame_id:
+                        continue
+                    score = job.last_served - job.priority * PRIORITY_HEAD_START
+                    if best is None or score < best[0]:
+                        best = (score, job)
+                if best is not None:
+                    best[1].busy = True
+                    return best[1]
+                self.cond.wait(0.01)
+        return None
+
+    def _release(self, job):
+        with self.cond:
+            job.busy = False
+            self.cond.notify_all()
+        if job.removed:
+            job.pipeline.close()
+
+    def _worker(self):
+        while self.running:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                ring = job.frames()
+                latest = ring.read_latest(job.last_frame_id, out=job.buffer) if ring else None
+                if latest is None:
+                    continue
+                frame_id, captured_at, job.buffer = latest
+                job.last_frame_id = frame_id
+
+                now = time.time()
+                if now - captured_at > self.max_frame_age:
+                    job.counters["stale"] += 1
+                    continue
+                if not job.pipeline.admit(job.buffer, now):
+                    job.counters["gated"] += 1
+                    continue
+                if not self._take_token():
+                    return
+
+                current_time = time.time()
+                result = job.pipeline.process(job.buffer, current_time, gated=False)
+                job.last_served = current_time
+                job.done_times.append(current_time)
+                job.counters["processed"] += 1
+                if not job.removed:
+                    job.on_result(result, frame_id, captured_at)
+            except Exception as e:
+                print(f"[SCHED] Inference failed for {job.cam_id}: {e}")
+            finally:
+                self._release(job)
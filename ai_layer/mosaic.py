@@ -0,0 +1,56 @@
+import math
+
+import cv2
+import numpy as np
+
+
+def grid_shape(n):
+    """(columns, rows) for n tiles, as close to square as possible."""
+    columns = max(1, math.ceil(math.sqrt(n)))
+    return columns, max(1, math.ceil(n / columns))
+
+
+class MosaicComposer:
+    """Tiles several camera frames into one preallocated canvas.
+
+    Each frame is scaled (aspect preserved, letterboxed) straight into a reused per-tile
+    buffer and copied into its cell, so composing allocates nothing once the layout and
+    source sizes settle. Missing frames render as a "No signal" tile.
+    """
+
+    def __init__(self, width=1280, height=720):
+        self.canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        self.layout = None
+        self.tiles = {}  # { cell index: scaled frame buffer }
+
+    def _cells(self, n):
+        if self.layout is None or self.layout[0] != n:
+            height, width = self.canvas.shape[:2]
+            columns, rows = grid_shape(n)
+            w, h = width // columns, height // rows
+            cells = [((i % columns) * w, (i // columns) * h, w, h) for i in range(n)]
+            self.layout = (n, cells)
+            self.tiles = {}
+        return self.layout[1]
+
+    def compose(self, sources):
+        """sources: [(label, BGR frame or None)] -> the canvas (reused between calls)."""
+        self.canvas[:] = 0
+        if not sources:
+            cv2.putText(self.canvas, "No active cameras", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+            return self.canvas
+        for i, ((label, frame), (x, y, w, h)) in enumerate(zip(sources, self._cells(len(sources)))):
+            if frame is not None:
+                fh, fw = frame.shape[:2]
+                scale = min(w / fw, h / fh)
+                tw, th = max(1, int(fw * scale)), max(1, int(fh * scale))
+                tile = self.tiles.get(i)
+                if tile is None or tile.shape != (th, tw) + frame.shape[2:]:
+                    tile = None
+                tile = self.tiles[i] = cv2.resize(frame, (tw, th), dst=tile, interpolation=cv2.INTER_LINEAR)
+                ox, oy = x + (w - tw) // 2, y + (h - th) // 2
+                self.canvas[oy:oy + th, ox:ox + tw] = tile
+            else:
+                cv2.putText(self.canvas, "No signal", (x + 10, y + h // 2), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (128, 128, 128), 1)
+            cv2.putText(self.canvas, label, (x + 6, y + h - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        return self.canvas
@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap per-camera gate in front of FaceMesh/recognition.
+
+    Each new frame is downscaled to a tiny grayscale image and differenced against the
+    last frame that was actually processed. Motion (or new faces, via boost()) snaps the
+    inference rate up to max_rate; while the scene stays static the rate decays towards
+    min_rate, and recognition passes are spaced out in proportion.
+    """
+
+    def __init__(self, min_rate=1.0, max_rate=20.0, motion_threshold=0.01, pixel_threshold=15,
+                 decay=0.9, size=(80, 60), max_recognition_interval=5.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.motion_threshold = motion_threshold  # Fraction of changed pixels that counts as motion
+        self.pixel_threshold = pixel_threshold    # Grey-level change that counts a pixel as changed
+        self.decay = decay
+        self.size = size
+        self.max_recognition_interval = max_recognition_interval
+        self.rate = max_rate
+        self.reference = None
+        self.last_run = 0.0
+        self.last_motion = 0.0
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def motion(self, thumbnail):
+        """Fraction of pixels that changed since the last processed frame."""
+        if self.reference is None:
+            return 1.0
+        diff = cv2.absdiff(thumbnail, self.reference)
+        return float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+
+    def should_run(self, frame, now):
+        thumbnail = self._thumbnail(frame)
+        self.last_motion = self.motion(thumbnail)
+        if self.last_motion > self.motion_threshold:
+            self.rate = self.max_rate
+        if now - self.last_run < 1.0 / self.rate:
+            return False
+        self.last_run = now
+        self.reference = thumbnail
+        # Static scene: slow down a little after every processed frame
+        if self.last_motion <= self.motion_threshold:
+            self.rate = max(self.min_rate, self.rate * self.decay)
+        return True
+
+    def boost(self):
+        """Something changed that pixels alone may not show (a new face, a face left)."""
+        self.rate = self.max_rate
+
+    def max_pass_gap(self, base_interval):
+        """Longest time between two recognition passes: the widest spacing, plus the wait
+        for the next admitted frame at min_rate."""
+        return max(base_interval, self.max_recognition_interval) + 1.0 / self.min_rate
+
+    def recognition_interval(self, base_interval):
+        """Recognition spacing scaled by how far the rate has dropped below max_rate."""
+        return min(base_interval * self.max_rate / self.rate, max(base_interval, self.max_recognition_interval))
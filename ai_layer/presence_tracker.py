@@ -0,0 +1,97 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class PresenceTracker:
+    """Per-student "not seen for N seconds" deadlines in a min-heap, on its own thread.
+
+    Sightings from every camera are a dict write (seen()); the heap is only touched when
+    a deadline actually comes due, where stale entries are pushed back to the student's
+    real deadline. Expired students are reported in one on_absent(session_id, [sids])
+    call per wake-up, so cost scales with sightings and expiries rather than with
+    roster size times loop rate, and no camera thread has to be alive for it to work.
+    """
+
+    def __init__(self, timeout=30.0, on_absent=None):
+        self.timeout = timeout
+        self.on_absent = on_absent
+        self.last_seen = {}   # { (session_id, student_id): timestamp }
+        self.heap = []        # (deadline, generation, session_id, student_id)
+        self.generations = {}  # { session_id: generation of its current start_session }
+        self._generation = itertools.count(1)
+        self.cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="presence-tracker", daemon=True)
+            self._thread.start()
+        return self
+
+    def start_session(self, session_id, student_ids, now=None):
+        """Begin tracking a roster; everyone's clock starts now."""
+        now = time.time() if now is None else now
+        with self.cond:
+            # A restarted session id gets a new generation, so its old heap entries are dropped
+            generation = self.generations[session_id] = next(self._generation)
+            # ...and students missing from the new roster stop counting as tracked
+            for key in [k for k in self.last_seen if k[0] == session_id]:
+                del self.last_seen[key]
+            for sid in student_ids:
+                self.last_seen[(session_id, sid)] = now
+                heapq.heappush(self.heap, (now + self.timeout, generation, session_id, sid))
+            self.cond.notify()
+
+    def end_session(self, session_id):
+        """Stop tracking a session; its heap entries are discarded lazily."""
+        with self.cond:
+            self.generations.pop(session_id, None)
+            for key in [k for k in self.last_seen if k[0] == session_id]:
+                del self.last_seen[key]
+
+    def seen(self, session_id, student_id, now=None):
+        key = (session_id, student_id)
+        with self.cond:
+            if key in self.last_seen:
+                self.last_seen[key] = time.time() if now is None else now
+
+    def tracked(self, session_id):
+        with self.cond:
+            return sum(1 for k in self.last_seen if k[0] == session_id)
+
+    def _collect_expired(self, now):
+        expired = {}
+        while self.heap and self.heap[0][0] <= now:
+            _, generation, session_id, sid = heapq.heappop(self.heap)
+            if self.generations.get(session_id) != generation:
+                continue  # Session ended or was restarted
+            key = (session_id, sid)
+            last_seen = self.last_seen.get(key)
+            if last_seen is None:
+                continue
+            if last_seen + self.timeout > now:
+                # Seen since this entry was pushed: move to the real deadline
+                heapq.heappush(self.heap, (last_seen + self.timeout, generation, session_id, sid))
+                continue
+            expired.setdefault(session_id, []).append(sid)
+            # Don't spam: restart the clock, as the per-loop check used to
+            self.last_seen[key] = now
+            heapq.heappush(self.heap, (now + self.timeout, generation, session_id, sid))
+        return expired
+
+    def _run(self):
+        while True:
+            with self.cond:
+                timeout = None
+                if self.heap:
+                    timeout = max(0.0, self.heap[0][0] - time.time())
+                self.cond.wait(timeout)
+                expired = self._collect_expired(time.time())
+            for session_id, sids in expired.items():
+                if self.on_absent:
+                    try:
+                        self.on_absent(session_id, sids)
+                    except Exception as e:
+                        print(f"[PRESENCE] on_absent failed: {e}")
@@ -0,0 +1,72 @@
+import threading
+import time
+
+# Phase states reported by StartupPhases.summary()
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"  # Last attempt failed; retried after a backoff
+
+
+class StartupPhases:
+    """Readiness of the node's startup phases (model warm-up, roster sync, ...).
+
+    Each phase runs on its own daemon thread so the HTTP server binds immediately;
+    a failing phase is retried with exponential backoff instead of leaving the node
+    half-initialized. Request handlers that need a phase wait() on it.
+    """
+
+    def __init__(self, names):
+        self.phases = {name: {"state": PENDING, "attempts": 0, "seconds": None, "error": None} for name in names}
+        self.started_at = time.time()
+        self.cond = threading.Condition()
+
+    def _update(self, name, **fields):
+        with self.cond:
+            self.phases[name].update(fields)
+            self.cond.notify_all()
+
+    def mark(self, name, state, **info):
+        """Set a phase's state directly, e.g. READY for a phase this node skips."""
+        self._update(name, state=state, **info)
+
+    def run(self, name, fn, backoff=1.0, max_backoff=30.0):
+        """Run fn() in the background until it returns without raising."""
+        def target():
+            attempts = 0
+            while True:
+                attempts += 1
+                self._update(name, state=RUNNING, attempts=attempts)
+                t0 = time.time()
+                try:
+                    fn()
+                except Exception as e:
+                    delay = min(backoff * 2 ** (attempts - 1), max_backoff)
+                    self._update(name, state=FAILED, error=str(e))
+                    print(f"[INIT ERROR] Startup phase '{name}' failed: {e}; retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                self._update(name, state=READY, seconds=round(time.time() - t0, 2), error=None)
+                print(f"[INIT] Startup phase '{name}' ready in {time.time() - t0:.1f}s")
+                return
+
+        threading.Thread(target=target, name=f"startup-{name}", daemon=True).start()
+
+    def ready(self, names=None):
+        with self.cond:
+            return all(self.phases[name]["state"] == READY for name in names or self.phases)
+
+    def wait(self, names=None, timeout=None):
+        """Block until the given phases (all by default) are ready; False on timeout."""
+        with self.cond:
+            return self.cond.wait_for(
+                lambda: all(self.phases[name]["state"] == READY for name in names or self.phases), timeout
+            )
+
+    def summary(self):
+        with self.cond:
+            return {
+                "ready": all(p["state"] == READY for p in self.phases.values()),
+                "uptimeSeconds": round(time.time() - self.started_at, 1),
+                "phases": {name: dict(p) for name, p in self.phases.items()},
+            }
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+JPEG_QUALITY = 80
+MAX_STREAM_FPS = 30
+
+
+def encode_jpeg(frame, quality=JPEG_QUALITY):
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+
+def placeholder_jpeg(text, width=640, height=480):
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.putText(frame, text, (50, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    return encode_jpeg(frame)
+
+
+class FrameBroadcaster:
+    """Encode-once MJPEG fan-out for one camera.
+
+    The capture thread publishes every annotated frame; it is JPEG-encoded at most once
+    (and only while someone is watching, capped at max_fps), tagged with a sequence
+    number, and every viewer is woken through a condition variable. A slow viewer simply
+    picks up the newest sequence next time round instead of queueing stale frames.
+    """
+
+    def __init__(self, quality=JPEG_QUALITY, max_fps=MAX_STREAM_FPS):
+        self.quality = quality
+        self.min_interval = 1.0 / max_fps
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.jpeg = None
+        self.viewers = 0
+        self.last_encode = 0.0
+
+    def publish(self, frame):
+        if self.viewers == 0:
+            return
+        now = time.time()
+        if now - self.last_encode < self.min_interval:
+            return
+        self.last_encode = now
+        jpeg = encode_jpeg(frame, self.quality)
+        with self.cond:
+            self.seq += 1
+            self.jpeg = jpeg
+            self.cond.notify_all()
+
+    def reset(self):
+        """Forget the last frame (camera stopped) and wake viewers so they notice."""
+        with self.cond:
+            self.seq += 1
+            self.jpeg = None
+            self.cond.notify_all()
+
+    def wait_next(self, last_seq, timeout=1.0):
+        """Block until a frame newer than last_seq exists; returns (seq, jpeg or None)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq != last_seq, timeout)
+            return self.seq, self.jpeg
+
+    def stream(self, waiting_text):
+        """multipart/x-mixed-replace generator for one viewer."""
+        with self.cond:
+            self.viewers += 1
+        waiting = None
+        try:
+            seq = -1
+            while True:
+                new_seq, jpeg = self.wait_next(seq)
+                if jpeg is None:
+                    # No frames (yet): keep the connection alive with a placeholder
+                    if waiting is None:
+                        waiting = placeholder_jpeg(waiting_text)
+                    jpeg = waiting
+                seq = new_seq
+                yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            with self.cond:
+                self.viewers -= 1
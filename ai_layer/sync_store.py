@@ -0,0 +1,51 @@
+import threading
+
+SYNC_COLLECTIONS = ("classrooms", "cameras", "students", "faculty")
+
+
+class SyncStore:
+    """In-memory mirror of the backend's AI sync data, kept current by deltas.
+
+    apply() takes either a full snapshot (/ai/sync, or a delta response with full=true)
+    or a delta (records changed since the cursor plus deleted ids) and updates the
+    per-collection dicts in place. It returns what actually changed, so callers only
+    redo work (enrollment, index rebuilds) for those records.
+    """
+
+    def __init__(self):
+        self.records = {name: {} for name in SYNC_COLLECTIONS}  # { collection: { _id: record } }
+        self.cursor = None
+        self.lock = threading.Lock()
+
+    def apply(self, payload):
+        """Apply a sync response; returns { collection: {"upserted": [ids], "deleted": [ids]} }."""
+        full = payload.get("full", "deleted" not in payload)  # Plain /ai/sync is a snapshot
+        deletions = payload.get("deleted") or {}
+        changes = {}
+        with self.lock:
+            for name in SYNC_COLLECTIONS:
+                records = self.records[name]
+                incoming = {r["_id"]: r for r in payload.get(name, []) if r.get("_id")}
+                deleted = set(deletions.get(name, []))
+                if full:
+                    deleted |= set(records) - set(incoming)
+
+                # Deltas overlap, so unchanged records come back; only count real changes
+                upserted = [rid for rid, r in incoming.items() if rid not in deleted and records.get(rid) != r]
+                for rid in upserted:
+                    records[rid] = incoming[rid]
+                removed = [rid for rid in deleted if records.pop(rid, None) is not None]
+                changes[name] = {"upserted": upserted, "deleted": removed}
+            self.cursor = payload.get("cursor", self.cursor)
+        return changes
+
+    def list(self, name):
+        with self.lock:
+            return list(self.records[name].values())
+
+    def get(self, name, record_id):
+        return self.records[name].get(record_id)
+
+    def counts(self):
+        with self.lock:
+            return {name: len(records) for name, records in self.records.items()}
@@ -1,6 +1,7 @@
 const Classroom = require('../models/Classroom');
 const Camera = require('../models/Camera');
 const User = require('../models/User');
+const SyncTombstone = require('../models/SyncTombstone');
 
 // --- Classrooms --- //
 
@@ -59,6 +60,7 @@ exports.deleteClassroom = async (req, res) => {
         const classroom = await Classroom.findById(req.params.id);
         if (!classroom) return res.status(404).json({ message: 'Classroom not found' });
         await Classroom.findByIdAndDelete(req.params.id);
+        await SyncTombstone.create({ kind: 'classrooms', docId: classroom._id });
         res.json({ message: 'Classroom removed' });
     } catch (error) {
         res.status(500).json({ message: error.message });
@@ -123,6 +125,7 @@ exports.deleteCamera = async (req, res) => {
         const camera = await Camera.findById(req.params.id);
         if (!camera) return res.status(404).json({ message: 'Camera not found' });
         await Camera.findByIdAndDelete(req.params.id);
+        await SyncTombstone.create({ kind: 'cameras', docId: camera._id });
         res.json({ message: 'Camera removed' });
     } catch (error) {
         res.status(500).json({ message: error.message });
@@ -284,8 +287,13 @@ exports.deleteUser = async (req, res) => {
         const user = await User.findById(req.params.id);
         if (!user) return res.status(404).json({ message: 'User not found' });
 
-        if (user.role === 'student') await Student.findOneAndDelete({ userId: user._id });
-        else if (user.role === 'faculty') await Faculty.findOneAndDelete({ userId: user._id });
+        if (user.role === 'student') {
+            const student = await Student.findOneAndDelete({ userId: user._id });
+            if (student) await SyncTombstone.create({ kind: 'students', docId: student._id });
+        } else if (user.role === 'faculty') {
+            const faculty = await Faculty.findOneAndDelete({ userId: user._id });
+            if (faculty) await SyncTombstone.create({ kind: 'faculty', docId: faculty._id });
+        }
 
         // Also clean up their attendance if applicable
         const Attendance = require('../models/Attendance');
@@ -10,150 +10,278 @@ const PENALTIES = {
     looking_away: 3
 };
 
-// @desc    Receive raw AI detection event
-// @route   POST /api/ai/events
-// @access  Internal Network Only (In production, restrict via IP/Secret)
-exports.receiveAIEvent = async (req, res) => {
-    try {
-        const { studentId, cameraId, classSessionId, timestamp, signals } = req.body;
+// Store one raw AI event and apply it to the student's attendance/engagement.
+// Shared by the single and bulk event routes.
+const processAIEvent = async ({ studentId, cameraId, classSessionId, timestamp, signals }) => {
+    // 1. Create Raw AI Event
+    const aiEvent = await AIEvent.create({
+        studentId,
+        cameraId,
+        classSessionId,
+        timestamp: timestamp || new Date(),
+        signals
+    });
 
-        // 1. Create Raw AI Event
-        const aiEvent = await AIEvent.create({
+    // 2. Process / Aggregate Attendance & Engagement logic
+
+    // Check if there is an existing Attendance record for this student + session
+    let attendance = await Attendance.findOne({ studentId, classSessionId });
+
+    if (!attendance) {
+        // First time seeing student in this session -> Mark Present
+        attendance = new Attendance({
             studentId,
-            cameraId,
             classSessionId,
-            timestamp: timestamp || new Date(),
-            signals
+            status: 'present',
+            engagementScore: 100,
+            behaviors: [],
+            source: 'ai'
         });
+    }
 
-        // 2. Process / Aggregate Attendance & Engagement logic
-
-        // Check if there is an existing Attendance record for this student + session
-        let attendance = await Attendance.findOne({ studentId, classSessionId });
-
-        if (!attendance) {
-            // First time seeing student in this session -> Mark Present
-            attendance = new Attendance({
-                studentId,
-                classSessionId,
-                status: 'present',
-                engagementScore: 100,
-                behaviors: [],
-                source: 'ai'
-            });
-        }
+    // IMPORTANT: OD overrides everything. 
+    // We only track engagement if they are specifically marked 'present'.
+    // If they were absent but now seen, override to present (unless OD).
 
-        // IMPORTANT: OD overrides everything. 
-        // We only track engagement if they are specifically marked 'present'.
-        // If they were absent but now seen, override to present (unless OD).
+    if (attendance.status === 'absent') {
+        attendance.status = 'present';
+    }
+
+    if (attendance.status === 'present') {
+        // Calculate penalty based on active signals
+        let totalPenalty = 0;
+        const now = new Date();
+
+        // Helper function to check if a signal was recently penalized (Debounce / Deduplication for Multi-Camera)
+        const isDuplicate = (type) => {
+            const recent = attendance.behaviors.filter(b => b.signalType === type);
+            if (recent.length === 0) return false;
+            const lastTime = new Date(recent[recent.length - 1].timestamp);
+            const diffSecs = (now - lastTime) / 1000;
+            return diffSecs < 60; // 60 seconds cooldown for the same penalty type
+        };
 
-        if (attendance.status === 'absent') {
-            attendance.status = 'present';
+        if (signals.sleeping && !isDuplicate('sleeping')) {
+            totalPenalty += PENALTIES.sleeping;
+            attendance.behaviors.push({ signalType: 'sleeping', timestamp: now, penalty: PENALTIES.sleeping });
+        }
+        if (signals.yawning && !isDuplicate('yawning')) {
+            totalPenalty += PENALTIES.yawning;
+            attendance.behaviors.push({ signalType: 'yawning', timestamp: now, penalty: PENALTIES.yawning });
+        }
+        if (signals.laughing && !isDuplicate('laughing')) {
+            totalPenalty += PENALTIES.laughing;
+            attendance.behaviors.push({ signalType: 'laughing', timestamp: now, penalty: PENALTIES.laughing });
+        }
+        if (signals.phone_usage && !isDuplicate('phone_usage')) {
+            totalPenalty += PENALTIES.phone_usage;
+            attendance.behaviors.push({ signalType: 'phone_usage', timestamp: now, penalty: PENALTIES.phone_usage });
+        }
+        if (signals.looking_away && !isDuplicate('looking_away')) {
+            totalPenalty += PENALTIES.looking_away;
+            attendance.behaviors.push({ signalType: 'looking_away', timestamp: now, penalty: PENALTIES.looking_away });
         }
 
-        if (attendance.status === 'present') {
-            // Calculate penalty based on active signals
-            let totalPenalty = 0;
-            const now = new Date();
-
-            // Helper function to check if a signal was recently penalized (Debounce / Deduplication for Multi-Camera)
-            const isDuplicate = (type) => {
-                const recent = attendance.behaviors.filter(b => b.signalType === type);
-                if (recent.length === 0) return false;
-                const lastTime = new Date(recent[recent.length - 1].timestamp);
-                const diffSecs = (now - lastTime) / 1000;
-                return diffSecs < 60; // 60 seconds cooldown for the same penalty type
-            };
-
-            if (signals.sleeping && !isDuplicate('sleeping')) {
-                totalPenalty += PENALTIES.sleeping;
-                attendance.behaviors.push({ signalType: 'sleeping', timestamp: now, penalty: PENALTIES.sleeping });
-            }
-            if (signals.yawning && !isDuplicate('yawning')) {
-                totalPenalty += PENALTIES.yawning;
-                attendance.behaviors.push({ signalType: 'yawning', timestamp: now, penalty: PENALTIES.yawning });
-            }
-            if (signals.laughing && !isDuplicate('laughing')) {
-                totalPenalty += PENALTIES.laughing;
-                attendance.behaviors.push({ signalType: 'laughing', timestamp: now, penalty: PENALTIES.laughing });
-            }
-            if (signals.phone_usage && !isDuplicate('phone_usage')) {
-                totalPenalty += PENALTIES.phone_usage;
-                attendance.behaviors.push({ signalType: 'phone_usage', timestamp: now, penalty: PENALTIES.phone_usage });
-            }
-            if (signals.looking_away && !isDuplicate('looking_away')) {
-                totalPenalty += PENALTIES.looking_away;
-                attendance.behaviors.push({ signalType: 'looking_away', timestamp: now, penalty: PENALTIES.looking_away });
-            }
-
-            // Deduct penalty (Minimum score is 0)
-            if (totalPenalty > 0) {
-                attendance.engagementScore = Math.max(0, attendance.engagementScore - totalPenalty);
-            }
-
-            // Save the updated attendance and engagement
-            await attendance.save();
+        // Deduct penalty (Minimum score is 0)
+        if (totalPenalty > 0) {
+            attendance.engagementScore = Math.max(0, attendance.engagementScore - totalPenalty);
         }
 
+        // Save the updated attendance and engagement
+        await attendance.save();
+    }
+
+    return aiEvent;
+};
+
+// @desc    Receive raw AI detection event
+// @route   POST /api/ai/events
+// @access  Internal Network Only (In production, restrict via IP/Secret)
+exports.receiveAIEvent = async (req, res) => {
+    try {
+        const aiEvent = await processAIEvent(req.body);
         res.status(201).json({ success: true, aiEventId: aiEvent._id });
     } catch (error) {
         res.status(400).json({ message: error.message });
     }
 };
 
+// Bad input (missing/invalid ids) fails the same way on every retry; anything else
+// (lost DB connection, write conflict) is worth the uploader sending again
+const isRetryable = (error) => !['ValidationError', 'CastError', 'StrictModeError'].includes(error.name);
+
+// Bulk responses: 201/200 when every item was applied, 207 with the failed item indexes
+// otherwise, so the AI layer's uploader requeues only the retryable ones
+const bulkFailure = (index, error) => ({ index, message: error.message, retryable: isRetryable(error) });
+
+// @desc    Receive a batch of raw AI detection events (AI layer uploader)
+// @route   POST /api/ai/events/bulk
+// @access  Internal Network Only
+exports.receiveAIEventsBulk = async (req, res) => {
+    const events = Array.isArray(req.body.events) ? req.body.events : [];
+    const results = [];
+    const failed = [];
+
+    // Sequential on purpose: events for the same student share one Attendance document
+    for (const [index, event] of events.entries()) {
+        try {
+            const aiEvent = await processAIEvent(event);
+            results.push({ success: true, aiEventId: aiEvent._id });
+        } catch (error) {
+            results.push({ success: false, message: error.message });
+            failed.push(bulkFailure(index, error));
+        }
+    }
+
+    res.status(failed.length ? 207 : 201).json({
+        success: failed.length === 0,
+        accepted: events.length - failed.length,
+        rejected: failed.length,
+        failed,
+        results
+    });
+};
+
 const Classroom = require('../models/Classroom');
 const Camera = require('../models/Camera');
 const Student = require('../models/Student');
 const Faculty = require('../models/Faculty');
+const User = require('../models/User');
+const SyncTombstone = require('../models/SyncTombstone');
+
+// Cursors older than this get a full snapshot; tombstones are kept this long
+const TOMBSTONE_RETENTION_MS = 30 * 24 * 60 * 60 * 1000;
+// Deltas overlap the previous one a little so writes in flight at cursor time are not missed
+const SYNC_OVERLAP_MS = 5000;
+
+const emptyDeletions = () => ({ classrooms: [], cameras: [], students: [], faculty: [] });
+
+// Everything the AI layer mirrors, optionally restricted to records changed since a date
+const loadSyncRecords = async (since) => {
+    const changed = since ? { updatedAt: { $gte: since } } : {};
+    let studentFilter = { imageUrl: { $ne: null } };
+    let facultyFilter = {};
+    if (since) {
+        // Names live on User, so an edited user counts as a change to its student/faculty record
+        const users = await User.find({ updatedAt: { $gte: since }, role: { $in: ['student', 'faculty'] } }).select('_id');
+        const userIds = users.map(u => u._id);
+        // Changed students without a photo are returned too; the caller turns them into deletions
+        studentFilter = { $or: [changed, { userId: { $in: userIds } }] };
+        facultyFilter = { $or: [changed, { userId: { $in: userIds } }] };
+    }
+
+    const [classrooms, cameras, students, faculty] = await Promise.all([
+        Classroom.find(changed),
+        Camera.find(changed).populate('classroomId', 'name'),
+        Student.find(studentFilter).populate('userId', 'name registerNumber status'),
+        Faculty.find(facultyFilter).populate('userId', 'name status')
+    ]);
+    return { classrooms, cameras, students, faculty };
+};
 
 // @desc    Sync all data needed for the AI layer (Classrooms, Cameras, Students with images, Faculty)
 // @route   GET /api/ai/sync
 // @access  Internal Network Only
 exports.syncData = async (req, res) => {
     try {
-        const classrooms = await Classroom.find();
-        const cameras = await Camera.find().populate('classroomId', 'name');
-        const students = await Student.find({ imageUrl: { $ne: null } }).populate('userId', 'name registerNumber status');
-        const faculty = await Faculty.find().populate('userId', 'name status');
-
-        res.json({
-            classrooms,
-            cameras,
-            students,
-            faculty
-        });
+        const cursor = new Date();
+        const records = await loadSyncRecords(null);
+
+        res.json({ cursor, ...records });
     } catch (error) {
         res.status(500).json({ message: 'Error syncing data: ' + error.message });
     }
 };
 
+// @desc    Incremental sync: records created, updated or deleted since the cursor of a previous sync
+// @route   GET /api/ai/sync/delta?since=<cursor>
+// @access  Internal Network Only
+exports.syncDelta = async (req, res) => {
+    try {
+        const cursor = new Date();
+        const horizon = new Date(cursor.getTime() - TOMBSTONE_RETENTION_MS);
+        const since = req.query.since ? new Date(req.query.since) : null;
+
+        // No cursor, a malformed one, or one older than our tombstones: full snapshot
+        if (!since || isNaN(since.getTime()) || since < horizon) {
+            const records = await loadSyncRecords(null);
+            return res.json({ full: true, cursor, ...records, deleted: emptyDeletions() });
+        }
+
+        const from = new Date(since.getTime() - SYNC_OVERLAP_MS);
+        const [records, tombstones] = await Promise.all([
+            loadSyncRecords(from),
+            SyncTombstone.find({ deletedAt: { $gte: from } })
+        ]);
+
+        const deleted = emptyDeletions();
+        tombstones.forEach(t => deleted[t.kind].push(t.docId));
+        // A student whose photo was removed drops out of the AI roster
+        records.students.filter(s => !s.imageUrl).forEach(s => deleted.students.push(s._id));
+        records.students = records.students.filter(s => s.imageUrl);
+
+        res.json({ full: false, cursor, ...records, deleted });
+
+        // Housekeeping off the response path
+        SyncTombstone.deleteMany({ deletedAt: { $lt: horizon } }).catch(err => console.error('Tombstone cleanup failed:', err.message));
+    } catch (error) {
+        res.status(500).json({ message: 'Error syncing delta: ' + error.message });
+    }
+};
+
+// Create an 'absent' attendance record unless the student already has one.
+// Shared by the single and bulk absent routes.
+const applyAbsent = async ({ studentId, classSessionId }) => {
+    let attendance = await Attendance.findOne({ studentId, classSessionId });
+
+    if (!attendance) {
+        attendance = new Attendance({
+            studentId,
+            classSessionId,
+            status: 'absent',
+            engagementScore: 0,
+            behaviors: [],
+            source: 'ai'
+        });
+        await attendance.save();
+    } else if (attendance.status === 'present') {
+        // Do nothing if they were already marked present. Or perhaps change to absent?
+        // Usually if they were present once, we don't automatically override back to absent after 30s, 
+        // because the 30s logic is meant for initial detection.
+    }
+};
+
 // @desc    Mark a student as absent (Used if not seen for 30s)
 // @route   POST /api/ai/absent
 // @access  Internal Network Only
 exports.markAbsent = async (req, res) => {
     try {
-        const { studentId, classSessionId } = req.body;
-
-        let attendance = await Attendance.findOne({ studentId, classSessionId });
-
-        if (!attendance) {
-            attendance = new Attendance({
-                studentId,
-                classSessionId,
-                status: 'absent',
-                engagementScore: 0,
-                behaviors: [],
-                source: 'ai'
-            });
-            await attendance.save();
-        } else if (attendance.status === 'present') {
-            // Do nothing if they were already marked present. Or perhaps change to absent?
-            // Usually if they were present once, we don't automatically override back to absent after 30s, 
-            // because the 30s logic is meant for initial detection.
-        }
-
+        await applyAbsent(req.body);
         res.status(200).json({ success: true });
     } catch (error) {
         res.status(500).json({ message: error.message });
     }
 };
+
+// @desc    Mark a batch of students as absent (AI layer uploader)
+// @route   POST /api/ai/absent/bulk
+// @access  Internal Network Only
+exports.markAbsentBulk = async (req, res) => {
+    const absences = Array.isArray(req.body.absences) ? req.body.absences : [];
+    const failed = [];
+
+    for (const [index, absence] of absences.entries()) {
+        try {
+            await applyAbsent(absence);
+        } catch (error) {
+            failed.push(bulkFailure(index, error));
+        }
+    }
+
+    res.status(failed.length ? 207 : 200).json({
+        success: failed.length === 0,
+        accepted: absences.length - failed.length,
+        rejected: failed.length,
+        failed
+    });
+};
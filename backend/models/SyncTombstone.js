@@ -0,0 +1,11 @@
+const mongoose = require('mongoose');
+
+// Records deletions of the documents the AI layer mirrors, so /api/ai/sync/delta can
+// report them. Pruned once they are older than the delta protocol's retention window.
+const syncTombstoneSchema = new mongoose.Schema({
+    kind: { type: String, enum: ['classrooms', 'cameras', 'students', 'faculty'], required: true },
+    docId: { type: mongoose.Schema.Types.ObjectId, required: true },
+    deletedAt: { type: Date, default: Date.now, index: true }
+});
+
+module.exports = mongoose.model('SyncTombstone', syncTombstoneSchema);
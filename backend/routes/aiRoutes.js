@@ -1,11 +1,14 @@
 const express = require('express');
 const router = express.Router();
-const { receiveAIEvent, syncData, markAbsent } = require('../controllers/aiController');
+const { receiveAIEvent, receiveAIEventsBulk, syncData, syncDelta, markAbsent, markAbsentBulk } = require('../controllers/aiController');
 
 // The AI route does not use standard JWT auth because it will be hit by the Python backend via internal networking.
 // In a real scenario, this might use an API key. For now, it's open.
 router.post('/events', receiveAIEvent);
+router.post('/events/bulk', receiveAIEventsBulk);
 router.get('/sync', syncData);
+router.get('/sync/delta', syncDelta);
 router.post('/absent', markAbsent);
+router.post('/absent/bulk', markAbsentBulk);
 
 module.exports = router;
@@ -5,6 +5,7 @@ const Classroom = require('./models/Classroom');
 const Camera = require('./models/Camera');
 const Student = require('./models/Student');
 const Faculty = require('./models/Faculty');
+const SyncTombstone = require('./models/SyncTombstone');
 require('dotenv').config();
 
 const seedData = async () => {
@@ -12,6 +13,13 @@ const seedData = async () => {
         await mongoose.connect(process.env.MONGODB_URI);
         console.log('Connected to DB. Clearing old data...');
 
+        // Tombstone everything the AI layer mirrors, so nodes syncing by delta drop it too
+        const mirrored = { classrooms: Classroom, cameras: Camera, students: Student, faculty: Faculty };
+        for (const [kind, Model] of Object.entries(mirrored)) {
+            const ids = await Model.distinct('_id');
+            if (ids.length) await SyncTombstone.insertMany(ids.map(docId => ({ kind, docId })));
+        }
+
         await User.deleteMany({});
         await Classroom.deleteMany({});
         await Camera.deleteMany({});
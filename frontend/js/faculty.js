@@ -118,36 +118,47 @@ async function startSession() {
                     body: JSON.stringify({ classSessionId: session._id, classroomId: select.value })
                 });
                 const aiData = await aiRes.json();
+                if (aiRes.status === 503) {
+                    // Node restarting (models/roster still loading): it answers once ready
+                    console.warn('AI layer not ready:', aiData.startup);
+                    document.getElementById('videoPlaceholder').innerText = 'AI Layer is still starting up — restart the session in a moment to enable auto-tracking.';
+                    throw Object.assign(new Error(aiData.error), { starting: true });
+                }
                 console.log(`[AI] Tracking ${aiData.tracked} students across ${aiData.cameras ? aiData.cameras.length : 1} cameras`);
 
                 const videoGrid = document.getElementById('videoGrid');
                 const placeholder = document.getElementById('videoPlaceholder');
                 placeholder.style.display = 'none';
 
-                // Dynamically create a labeled feed wrapper for each camera
+                // One camera gets its own labeled feed; several are tiled server-side into a
+                // single /video_mosaic stream so the page holds one connection, not one per camera
                 if (aiData.cameras && aiData.cameras.length > 0) {
                     console.log(`[AI] Tracking ${aiData.tracked} students across ${aiData.cameras.length} cameras`);
-                    aiData.cameras.forEach(cam => {
+                    const wrapper = document.createElement('div');
+                    wrapper.style.cssText = 'display: flex; flex-direction: column; gap: 6px;';
+
+                    const label = document.createElement('div');
+                    label.style.cssText = 'color: #22c55e; font-size: 0.75rem; font-family: monospace; font-weight: 600; letter-spacing: 0.05em; padding-left: 4px;';
+
+                    const img = document.createElement('img');
+                    img.className = 'ai-video-feed';
+                    img.style.cssText = 'width: 100%; height: auto; border-radius: 8px; border: 2px solid #22c55e;';
+
+                    if (aiData.cameras.length === 1) {
                         // Support both old (string) and new ({id, name}) formats
+                        const cam = aiData.cameras[0];
                         const camId = (typeof cam === 'object') ? cam.id : cam;
                         const camName = (typeof cam === 'object') ? cam.name : camId;
-
-                        const wrapper = document.createElement('div');
-                        wrapper.style.cssText = 'display: flex; flex-direction: column; gap: 6px;';
-
-                        const label = document.createElement('div');
-                        label.style.cssText = 'color: #22c55e; font-size: 0.75rem; font-family: monospace; font-weight: 600; letter-spacing: 0.05em; padding-left: 4px;';
                         label.textContent = `📷 ${camName}`;
-
-                        const img = document.createElement('img');
-                        img.className = 'ai-video-feed';
                         img.src = `http://localhost:5001/video_feed?cameraId=${camId}&t=${Date.now()}`;
-                        img.style.cssText = 'width: 100%; height: auto; border-radius: 8px; border: 2px solid #22c55e;';
-
-                        wrapper.appendChild(label);
-                        wrapper.appendChild(img);
-                        videoGrid.appendChild(wrapper);
-                    });
+                    } else {
+                        label.textContent = `📷 ${aiData.cameras.length} cameras`;
+                        img.src = `http://localhost:5001/video_mosaic?classSessionId=${currentSessionId}&t=${Date.now()}`;
+                    }
+
+                    wrapper.appendChild(label);
+                    wrapper.appendChild(img);
+                    videoGrid.appendChild(wrapper);
                 } else {
                     // Fallback if no specific cameras returned
                     const img = document.createElement('img');
@@ -157,7 +168,9 @@ async function startSession() {
                 }
             } catch (aiErr) {
                 console.warn('Python AI layer disconnected:', aiErr);
-                document.getElementById('videoPlaceholder').innerText = 'AI Layer Offline — Attendance will not be auto-tracked.';
+                if (!aiErr.starting) {
+                    document.getElementById('videoPlaceholder').innerText = 'AI Layer Offline — Attendance will not be auto-tracked.';
+                }
             }
 
             startBtn.style.display = 'none';
@@ -192,7 +205,13 @@ async function endSession() {
     try {
         await fetchAPI(`faculty/sessions/${currentSessionId}/end`, { method: 'PUT' });
 
-        try { await fetch('http://localhost:5001/stop-mocking', { method: 'POST' }); } catch (e) { }
+        try {
+            await fetch('http://localhost:5001/stop-mocking', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ classSessionId: currentSessionId })
+            });
+        } catch (e) { }
 
         const videoGrid = document.getElementById('videoGrid');
         // Remove all feed wrappers (camera label + img)
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "ai_layer"))
+
+from behavior_metrics import SIGNALS, BehaviorSmoother, compute_metrics, signal_matrix  # noqa: E402
+
+# Six saved FaceMesh-shaped faces (6, 478, 3): attentive, eyes closed, mouth wide open,
+# head turned, nose dropped towards the chin (looking down) and a wide smile
+FIXTURE = os.path.join(ROOT, "test_data", "behavior_landmarks.npz")
+EXPECTED_SIGNALS = [
+    [],
+    ["sleeping"],
+    ["yawning"],
+    ["looking_away"],
+    ["phone_usage"],
+    ["laughing"],
+]
+
+
+def test_metrics_match_saved_outputs():
+    data = np.load(FIXTURE)
+    metrics = compute_metrics(data["landmarks"])
+    for name in ("ear", "mar", "yaw_ratio"):
+        assert np.allclose(metrics[name], data[name], atol=1e-6), name
+    assert np.allclose(metrics["ear"], [1 / 3, 1 / 30, 1 / 3, 1 / 3, 1 / 3, 1 / 3], atol=1e-4)
+    assert np.allclose(metrics["mar"], [0.125, 0.125, 0.75, 0.125, 0.125, 0.3], atol=1e-4)
+    assert np.allclose(metrics["yaw_ratio"], [1, 1, 1, 0.2, 1, 1], atol=1e-4)
+
+
+def test_signals_match_saved_outputs():
+    data = np.load(FIXTURE)
+    raw = signal_matrix(data["landmarks"])
+    assert (raw == data["signals"]).all()
+    for row, expected in zip(raw, EXPECTED_SIGNALS):
+        assert [name for name, v in zip(SIGNALS, row) if v] == expected
+
+
+def test_no_faces():
+    assert signal_matrix(np.empty((0, 478, 3), dtype=np.float32)).shape == (0, len(SIGNALS))
+
+
+def test_smoother_needs_consecutive_frames():
+    min_frames = {name: 1 for name in SIGNALS}
+    min_frames["sleeping"] = 3
+    smoother = BehaviorSmoother(min_frames)
+    closed = [name == "sleeping" for name in SIGNALS]
+    opened = [False] * len(SIGNALS)
+
+    assert [smoother.update("s1", closed, t)["sleeping"] for t in (0, 1, 2)] == [False, False, True]
+    # One open-eye frame resets the run
+    assert not smoother.update("s1", opened, 3)["sleeping"]
+    assert [smoother.update("s1", closed, t)["sleeping"] for t in (4, 5, 6)] == [False, False, True]
+    # Students are smoothed independently
+    assert not smoother.update("s2", closed, 6)["sleeping"]
+
+
+def test_smoother_forgets_idle_students():
+    smoother = BehaviorSmoother({name: 2 for name in SIGNALS}, max_idle=10.0)
+    yawning = [name == "yawning" for name in SIGNALS]
+    smoother.update("s1", yawning, 0)
+    # Not seen for longer than max_idle: the old run doesn't count
+    assert not smoother.update("s1", yawning, 20)["yawning"]
+    assert smoother.update("s1", yawning, 21)["yawning"]
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: ok")
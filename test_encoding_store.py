@@ -0,0 +1,88 @@
+import glob
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "ai_layer"))
+
+from encoding_store import NO_FACE_ROW, EncodingStore  # noqa: E402
+from face_index import ENCODING_DIM  # noqa: E402
+
+
+def matrices(directory):
+    return sorted(os.path.basename(p) for p in glob.glob(os.path.join(directory, "encodings.*.npy")))
+
+
+def test_save_load_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        store = EncodingStore(directory)
+        store.put("s1", "a" * 40, "u1", np.full(ENCODING_DIM, 0.1))
+        store.put("s2", "b" * 40, "u2", None)  # No face in the photo
+        store.save()
+
+        loaded = EncodingStore(directory).load()
+        assert len(loaded) == 2
+        assert loaded.entry("s2")["row"] == NO_FACE_ROW
+        assert loaded.is_current("s1", "a" * 40)
+        assert list(loaded.encodings()) == ["s1"]
+        assert np.allclose(loaded.get("s1"), 0.1)
+
+
+def test_save_swaps_generations():
+    with tempfile.TemporaryDirectory() as directory:
+        store = EncodingStore(directory)
+        store.put("s1", "a" * 40, "u1", np.full(ENCODING_DIM, 0.1))
+        store.save()
+        first = matrices(directory)
+
+        store.put("s1", "c" * 40, "u1", np.full(ENCODING_DIM, 0.3))
+        store.save()
+        second = matrices(directory)
+        # A new generation replaced the old one, which is removed after the commit point
+        assert len(first) == len(second) == 1 and first != second
+        with open(store.index_path) as f:
+            assert json.load(f)["matrix"] == second[0]
+        assert np.allclose(EncodingStore(directory).load().get("s1"), 0.3)
+
+
+def test_crash_before_commit_keeps_old_generation():
+    with tempfile.TemporaryDirectory() as directory:
+        store = EncodingStore(directory)
+        store.put("s1", "a" * 40, "u1", np.full(ENCODING_DIM, 0.1))
+        store.save()
+        # A save that died after writing its matrix but before replacing the index
+        np.save(os.path.join(directory, "encodings.deadbeef0000.npy"), np.zeros((2, ENCODING_DIM)))
+        with open(store.index_path + ".tmp", "w") as f:
+            f.write("{\"rows\": 2, \"matr")
+
+        loaded = EncodingStore(directory).load()
+        assert np.allclose(loaded.get("s1"), 0.1)
+        # The next save cleans the orphan up
+        loaded.put("s2", "b" * 40, "u2", np.full(ENCODING_DIM, 0.2))
+        loaded.save()
+        assert len(matrices(directory)) == 1
+        assert sorted(EncodingStore(directory).load().encodings()) == ["s1", "s2"]
+
+
+def test_inconsistent_index_is_ignored():
+    with tempfile.TemporaryDirectory() as directory:
+        store = EncodingStore(directory)
+        store.put("s1", "a" * 40, "u1", np.full(ENCODING_DIM, 0.1))
+        store.save()
+        with open(store.index_path) as f:
+            index = json.load(f)
+        index["rows"] = 5
+        with open(store.index_path, "w") as f:
+            json.dump(index, f)
+        assert len(EncodingStore(directory).load()) == 0
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: ok")
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "ai_layer"))
+
+from face_tracker import FaceTracker  # noqa: E402
+from motion_gate import MotionGate  # noqa: E402
+
+# Same constants CameraPipeline builds its gate and tracker from
+RECOGNITION_INTERVAL = 1.0
+TRACK_AGE_MARGIN = 1.0
+MESH_FACES = 5  # FaceMesh max_num_faces: only this many tracks move between passes
+
+
+def simulate(max_age, faces=10, seconds=40.0, fps=20.0):
+    """A static room with more faces than FaceMesh follows, run through the gate's cadence.
+
+    Returns (dlib encodings, recognition passes, distinct track IDs ever assigned).
+    """
+    gate = MotionGate(min_rate=1.0, max_rate=20.0)
+    tracker = FaceTracker(max_age=max_age)
+    boxes = [(100, 60 * i + 50, 150, 60 * i) for i in range(faces)]
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    encodings = passes = 0
+    track_ids = set()
+    last_rec = -1e9
+    for step in range(int(seconds * fps)):
+        now = step / fps
+        if not gate.should_run(frame, now):
+            continue
+        if now - last_rec > gate.recognition_interval(RECOGNITION_INTERVAL):
+            tracks = tracker.update(boxes, now)
+            track_ids.update(t.track_id for t in tracks)
+            for i, track in enumerate(tracks):
+                if tracker.needs_identification(track, now):
+                    encodings += 1
+                    tracker.identify(track, f"s{i}", 0.3, now)
+            passes += 1
+            last_rec = now
+        else:
+            tracker.update(boxes[:MESH_FACES], now, spawn=False)
+    return encodings, passes, track_ids
+
+
+def test_tracks_survive_the_widest_recognition_gap():
+    gate = MotionGate(min_rate=1.0, max_rate=20.0)
+    max_age = gate.max_pass_gap(RECOGNITION_INTERVAL) + TRACK_AGE_MARGIN
+    encodings, passes, track_ids = simulate(max_age)
+    assert passes >= 8
+    # Every face keeps its first track; only the periodic re-checks cost encodings
+    assert track_ids == set(range(1, 11))
+    reidentify_after = FaceTracker().reidentify_after
+    assert encodings <= 10 * (40.0 // reidentify_after + 1)
+
+
+def test_short_max_age_loses_faces_meshes_do_not_follow():
+    encodings, _, track_ids = simulate(max_age=2.0)
+    fixed, _, _ = simulate(MotionGate(min_rate=1.0).max_pass_gap(RECOGNITION_INTERVAL) + TRACK_AGE_MARGIN)
+    assert len(track_ids) > 10
+    assert encodings > fixed
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: ok")
@@ -0,0 +1,48 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "ai_layer"))
+
+from presence_tracker import PresenceTracker  # noqa: E402
+
+# The tracker thread is never started: tests drive _collect_expired() with their own clock
+
+
+def test_restart_with_smaller_roster():
+    tracker = PresenceTracker(timeout=30.0)
+    tracker.start_session("c1", ["s1", "s2"], now=0)
+    tracker.start_session("c1", ["s1"], now=10)
+    assert tracker.tracked("c1") == 1
+    # The first start's entries (due at 30) belong to an old generation and never fire
+    assert tracker._collect_expired(35) == {}
+    assert tracker._collect_expired(40) == {"c1": ["s1"]}
+
+
+def test_sightings_push_the_deadline_back():
+    tracker = PresenceTracker(timeout=30.0)
+    tracker.start_session("c1", ["s1", "s2"], now=0)
+    tracker.seen("c1", "s1", now=20)
+    tracker.seen("c1", "unknown", now=20)  # Not on the roster: ignored
+    assert tracker.tracked("c1") == 2
+    assert tracker._collect_expired(30) == {"c1": ["s2"]}
+    assert tracker._collect_expired(50) == {"c1": ["s1"]}
+    # Reported students restart their clock instead of firing again on every wake-up
+    assert tracker._collect_expired(55) == {}
+    assert tracker._collect_expired(60) == {"c1": ["s2"]}
+
+
+def test_end_session_stops_expiry():
+    tracker = PresenceTracker(timeout=30.0)
+    tracker.start_session("c1", ["s1"], now=0)
+    tracker.start_session("c2", ["s2"], now=0)
+    tracker.end_session("c1")
+    assert tracker.tracked("c1") == 0
+    assert tracker._collect_expired(30) == {"c2": ["s2"]}
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: ok")
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+AI_LAYER = os.path.join(ROOT, "ai_layer")
+
+# Every spawned child of a node started with `python app.py` re-executes app.py as
+# __mp_main__ before running its task. These scripts pose as that main script and report,
+# from inside the child, whether app.py's module code started anything.
+IMPORT_AS_CHILD = """
+import runpy, threading
+namespace = runpy.run_path("app.py", run_name="__mp_main__")
+phases = namespace["STARTUP"].summary()["phases"]
+print(threading.active_count(), namespace["global_state"]["started"], sorted({p["state"] for p in phases.values()}))
+"""
+
+REPORT = "(__import__('threading').active_count(), __import__('sys').modules['__mp_main__'].global_state['started'])"
+
+ENCODE_WORKER = f"""
+import multiprocessing, os, sys
+from concurrent.futures import ProcessPoolExecutor
+sys.modules["__main__"].__file__ = os.path.abspath("app.py")
+if __name__ == "__main__":
+    # Same pool enroll_students() uses for encode_photo
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        print(*pool.submit(eval, "{REPORT}").result())
+"""
+
+CAMERA_WORKER = f"""
+import os, sys
+sys.modules["__main__"].__file__ = os.path.abspath("app.py")
+from camera_worker import _ctx
+if __name__ == "__main__":
+    results = _ctx.Queue()
+    proc = _ctx.Process(target=exec, args=("q.put({REPORT})", {{"q": results}}))
+    proc.start()
+    print(*results.get(timeout=60))
+    proc.join()
+"""
+
+
+def run(script):
+    env = dict(os.environ, AI_BACKEND_URL="http://127.0.0.1:9/api")
+    out = subprocess.run([sys.executable, "-c", script], cwd=AI_LAYER, env=env,
+                         capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    assert "[INIT" not in out.stdout, out.stdout  # No sync attempt, no startup phase
+    return out.stdout.strip().splitlines()[-1]
+
+
+def test_importing_app_starts_nothing():
+    # No uploader/tracker/startup threads and no sync until start() is called
+    assert run(IMPORT_AS_CHILD) == "1 False ['pending']"
+
+
+def test_encode_worker_runs_no_startup():
+    assert run(ENCODE_WORKER) == "1 False"
+
+
+def test_camera_worker_runs_no_startup():
+    assert run(CAMERA_WORKER) == "1 False"
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: ok")